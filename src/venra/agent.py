@@ -1,15 +1,21 @@
 import os
+import re
 import json
-import requests
-import instructor
-from openai import OpenAI
+import asyncio
+import hashlib
+import httpx
+from functools import cached_property
+from cachetools import LFUCache
 from pydantic import BaseModel, Field
 from typing import List, Optional, Literal, Dict, Any
 from venra.config import settings
 from venra.executor import PythonExecutor
+from venra.http import get_http_client
 from venra.prompt_loader import load_prompt
 from venra.logging_config import logger
 
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
 class AgentReasoning(BaseModel):
     """The internal thought process of the agent."""
     plan: str = Field(..., description="Step-by-step logic of how to answer the query.")
@@ -28,93 +34,194 @@ class FinalResponse(BaseModel):
     groundedness_score: float = Field(..., description="0.0 to 1.0. High for document context, low for internal knowledge.")
     is_self_aware_warning: bool = Field(..., description="True if the agent is guessing, lacks data, or used internal knowledge.")
 
+_FENCE_RE = re.compile(r"```(?:json)?(.*?)(?:```|$)", re.DOTALL)
+
+def _strip_code_fence(content: str) -> str:
+    """Returns the body of the first ```json (or bare ```) fence, or the content as-is."""
+    if "```" not in content:
+        return content
+    fenced = _FENCE_RE.search(content, content.find("```json") if "```json" in content else 0)
+    return fenced.group(1).strip()
+
+# Built once at import: the schema is part of the static Pass 1 system prefix.
+_AGENT_REASONING_SCHEMA_JSON = json.dumps(AgentReasoning.model_json_schema(), indent=2, sort_keys=True)
+
 class ReasoningAgent:
-    def __init__(self, api_key: Optional[str] = None):
+    # Responses are only cached while synthesis is deterministic.
+    PASS_2_TEMPERATURE = 0.0
+
+    def __init__(self, api_key: Optional[str] = None, http_client: Optional[httpx.AsyncClient] = None):
         self.nvidia_api_key = api_key or settings.NVIDIA_API_KEY
         self.nvidia_url = "https://integrate.api.nvidia.com/v1/chat/completions"
         self.executor = PythonExecutor()
         self.kimi_model = "moonshotai/kimi-k2.5"
-        
-        # Fast client for second pass (Synthesis)
-        self.fast_client = instructor.from_openai(
-            OpenAI(
-                base_url="https://api.groq.com/openai/v1",
-                api_key=settings.GROQ_API_KEY or "dummy_key"
-            ),
-            mode=instructor.Mode.JSON
-        )
+        self._http = http_client or get_http_client()
+
         self.pass_1_prompt = load_prompt("agent_pass_1_reasoning")
         self.pass_2_prompt = load_prompt("agent_pass_2_synthesis")
 
-    def _call_kimi_reasoning(self, messages: List[Dict[str, str]]) -> AgentReasoning:
+        # Static prefix for Pass 1: built once so every request shares a byte-identical
+        # system message that providers can serve from their prompt cache.
+        self._pass1_system = (
+            f"{self.pass_1_prompt}\n\nOUTPUT_SCHEMA:\n{_AGENT_REASONING_SCHEMA_JSON}\n\n"
+            "Strictly return valid JSON matching this schema."
+        )
+
+        # Response cache keyed by (query, context); LFU keeps hot dashboard questions resident.
+        self._resp_cache = LFUCache(maxsize=512)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @cached_property
+    def fast_client(self):
+        """
+        Fast client for second pass (Synthesis). Shares the pool with Pass 1 so the
+        prewarmed Groq connection is the one the synthesis call actually uses.
+        openai/instructor are imported on first use to keep them off the app's import path.
+        """
+        import instructor
+        from openai import AsyncOpenAI
+
+        groq = AsyncOpenAI(
+            base_url=GROQ_BASE_URL,
+            api_key=settings.GROQ_API_KEY or "dummy_key",
+            http_client=self._http
+        )
+        return instructor.from_openai(groq, mode=instructor.Mode.JSON)
+
+    @cached_property
+    def _final_response_model(self):
+        """
+        FinalResponse pre-wrapped as an instructor OpenAISchema. instructor otherwise
+        runs create_model() on the plain model for every Pass 2 call.
+        """
+        import instructor
+        return instructor.openai_schema(FinalResponse)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": self._resp_cache.currsize,
+            "maxsize": self._resp_cache.maxsize
+        }
+
+    @staticmethod
+    def _cache_key(query: str, context: str) -> str:
+        return hashlib.blake2b((query + "\x00" + context).encode(), digest_size=16).hexdigest()
+
+    async def _prewarm_fast_client(self):
+        """Opens the Groq connection (TCP + TLS + HTTP/2 settings) while Pass 1 is still thinking."""
+        try:
+            await self._http.get(
+                f"{GROQ_BASE_URL}/models",
+                headers={"Authorization": f"Bearer {settings.GROQ_API_KEY or 'dummy_key'}"}
+            )
+        except httpx.HTTPError as e:
+            logger.debug("Groq prewarm failed (non-fatal): %s", e)
+
+    async def _call_kimi_reasoning(self, messages: List[Dict[str, str]], cache_key: Optional[str] = None) -> AgentReasoning:
         """Calls Kimi for deep reasoning and code generation."""
         headers = {
             "Authorization": f"Bearer {self.nvidia_api_key}",
             "Accept": "application/json"
         }
         
-        schema_json = json.dumps(AgentReasoning.model_json_schema(), indent=2)
-        messages[0]["content"] += f"\n\nOUTPUT_SCHEMA:\n{schema_json}\n\nStrictly return valid JSON matching this schema."
-        
         payload = {
             "model": self.kimi_model,
             "messages": messages,
             "temperature": 0.1,
             "chat_template_kwargs": {"thinking": True}
         }
+        if cache_key:
+            payload["prompt_cache_key"] = cache_key
 
-        response = requests.post(self.nvidia_url, headers=headers, json=payload)
+        response = await self._http.post(self.nvidia_url, headers=headers, json=payload)
         response.raise_for_status()
         
         content = response.json()["choices"][0]["message"]["content"]
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-            
-        return AgentReasoning.model_validate_json(content)
-
-    async def answer(self, query: str, context: str) -> Dict[str, Any]:
-        logger.info(f"Agent processing query (Pass 1: Kimi Reasoning): {query}")
+        # Validated straight from the JSON text: pydantic-core parses and validates in one pass.
+        return AgentReasoning.model_validate_json(_strip_code_fence(content))
+
+    async def answer(self, query: str, context: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        cacheable = self.PASS_2_TEMPERATURE == 0.0
+        key = self._cache_key(query, context) if cacheable else None
+        if key is not None:
+            cached = self._resp_cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                logger.info("Agent cache hit for query: %s", query)
+                return {
+                    "final_response": FinalResponse.model_validate_json(cached["final_response"]),
+                    "reasoning": AgentReasoning.model_validate_json(cached["reasoning"]),
+                    "code_result": cached["code_result"]
+                }
+            self.cache_misses += 1
+
+        logger.info("Agent processing query (Pass 1: Kimi Reasoning): %s", query)
         
         # Pass 1: Kimi for Logic/Code
+        # Ordered from most to least stable (system+schema -> context -> query) so the
+        # longest possible prefix is reusable across questions on the same document.
         messages_1 = [
-            {"role": "system", "content": self.pass_1_prompt}, 
-            {"role": "user", "content": f"CONTEXT:\n{context}\n\nQUERY: {query}"}
+            {"role": "system", "content": self._pass1_system},
+            {"role": "user", "content": f"CONTEXT:\n{context}"},
+            {"role": "user", "content": f"QUERY: {query}"}
         ]
         
-        reasoning = self._call_kimi_reasoning(messages_1)
-        logger.info(f"Reasoning Plan: {reasoning.plan}")
+        prewarm_task = asyncio.create_task(self._prewarm_fast_client())
+        try:
+            reasoning = await self._call_kimi_reasoning(messages_1, cache_key=session_id)
+        except BaseException:
+            # Nothing will await the prewarm now; cancel it instead of leaking a pending task
+            prewarm_task.cancel()
+            raise
+        logger.info("Reasoning Plan: %s", reasoning.plan)
 
         code_result = None
         if reasoning.requires_math and reasoning.python_code:
-            logger.info(f"Executing Python code:\n{reasoning.python_code}")
-            code_result = self.executor.execute(reasoning.python_code)
+            logger.info("Executing Python code:\n%s", reasoning.python_code)
+            code_result, _ = await asyncio.gather(
+                self.executor.execute(reasoning.python_code),
+                prewarm_task
+            )
             if code_result["error"]:
-                logger.error(f"Code execution failed: {code_result['error']}")
+                logger.error("Code execution failed: %s", code_result['error'])
             else:
-                logger.info(f"Code output: {code_result['output']}")
+                logger.info("Code output: %s", code_result['output'])
+        else:
+            await prewarm_task
 
         # Pass 2: Groq for fast Synthesis
         logger.info("Pass 2: Synthesis (Fast)")
         
-        user_prompt_2 = f"""
-QUERY: {query}
+        context_prompt_2 = f"""
 CONTEXT: {context}
 REASONING: {reasoning.plan}
+"""
+        query_prompt_2 = f"""
+QUERY: {query}
 CODE_OUTPUT: {code_result['output'] if code_result else 'No code run'}
 CODE_ERROR: {code_result['error'] if code_result else 'None'}
 """
         
-        final = self.fast_client.chat.completions.create(
+        final = await self.fast_client.chat.completions.create(
             model=settings.SLM_MODEL_PRECISION, # llama-3.3-70b
-            response_model=FinalResponse,
+            response_model=self._final_response_model,
             messages=[
                 {"role": "system", "content": self.pass_2_prompt},
-                {"role": "user", "content": user_prompt_2}
+                {"role": "user", "content": context_prompt_2},
+                {"role": "user", "content": query_prompt_2}
             ],
-            temperature=0.0
+            temperature=self.PASS_2_TEMPERATURE
         )
+
+        if key is not None:
+            self._resp_cache[key] = {
+                "final_response": final.model_dump_json(),
+                "reasoning": reasoning.model_dump_json(),
+                "code_result": code_result
+            }
         
         return {
             "final_response": final,
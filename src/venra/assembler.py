@@ -1,9 +1,28 @@
-import pandas as pd
-from typing import List, Dict, Any
+import io
+import logging
+from collections import Counter
+from operator import attrgetter
+from typing import List, Dict, Any, Callable
+import ahocorasick
 from venra.models import UFLRow, DocBlock
 from venra.prompt_loader import load_prompt
 from venra.logging_config import logger
 
+# Columns shown to the Reasoning Agent, in prompt order
+UFL_COLS = ('row_id', 'metric_name', 'value', 'unit', 'period', 'nuance_note', 'source_chunk_id')
+
+# Below these sizes the plain substring loop beats building an automaton
+AHO_MIN_KEYWORDS = 4
+AHO_MIN_CHUNKS = 20
+
+def _fmt(value: Any) -> str:
+    """Renders a UFL cell for a markdown table without losing numeric precision."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).replace("|", "\\|")
+
 class ContextAssembler:
     """
     Step 2: Prepares the retrieved data for the Reasoning Agent.
@@ -52,6 +71,8 @@ class ContextAssembler:
             
         scored_chunks = []
         ufl_source_ids = {r.source_chunk_id for r in ufl_rows if r.source_chunk_id}
+        keywords_lower = [kw.lower() for kw in keywords]
+        keyword_score = self._keyword_scorer(keywords_lower, len(chunks))
         
         for chunk in chunks:
             score = 0
@@ -60,10 +81,7 @@ class ContextAssembler:
                 score += 5
             
             # Priority 2: Contains keywords (Relevance)
-            content_lower = chunk.content.lower()
-            for kw in keywords:
-                if kw.lower() in content_lower:
-                    score += 1
+            score += keyword_score(chunk.content.lower())
             
             scored_chunks.append((score, chunk))
             
@@ -71,45 +89,66 @@ class ContextAssembler:
         scored_chunks.sort(key=lambda x: x[0], reverse=True)
         
         top_chunks = [c for s, c in scored_chunks[:limit]]
-        log_msg = f"Smart filtered {len(chunks)} -> {len(top_chunks)}. "
-        log_msg += f"Top Scores: {[s for s, c in scored_chunks[:limit]]}. "
-        log_msg += f"Selected IDs: {[c.id for c in top_chunks]}"
-        logger.info(log_msg)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Smart filtered %s -> %s. Top Scores: %s. Selected IDs: %s",
+                len(chunks), len(top_chunks),
+                [s for s, c in scored_chunks[:limit]], [c.id for c in top_chunks]
+            )
         
         return top_chunks
 
+    @staticmethod
+    def _keyword_scorer(keywords_lower: List[str], num_chunks: int) -> Callable[[str], int]:
+        """
+        Returns a function counting how many keywords occur in a lowercased text.
+        Large batches use an Aho-Corasick automaton: one pass per chunk regardless of keyword count.
+        """
+        if len(keywords_lower) < AHO_MIN_KEYWORDS or num_chunks < AHO_MIN_CHUNKS:
+            return lambda text: sum(1 for kw in keywords_lower if kw in text)
+
+        # Duplicate keywords count once per occurrence in the list, as in the simple path
+        weights = Counter(keywords_lower)
+        always = weights.pop("", 0)
+        if not weights:
+            return lambda text: always
+
+        automaton = ahocorasick.Automaton()
+        for kw, weight in weights.items():
+            automaton.add_word(kw, (kw, weight))
+        automaton.make_automaton()
+
+        def score(text: str) -> int:
+            found = {kw: weight for _, (kw, weight) in automaton.iter(text)}
+            return always + sum(found.values())
+        return score
+
     def _deduplicate_rows(self, rows: List[UFLRow]) -> List[UFLRow]:
-        seen_ids = set()
-        unique = []
+        # Insertion-ordered dict: one hash op per row, first occurrence wins
+        unique: Dict[str, UFLRow] = {}
         for r in rows:
-            if r.row_id not in seen_ids:
-                unique.append(r)
-                seen_ids.add(r.row_id)
-        return unique
+            unique.setdefault(r.row_id, r)
+        return list(unique.values())
 
     def _deduplicate_chunks(self, chunks: List[DocBlock]) -> List[DocBlock]:
-        seen_ids = set()
-        unique = []
+        unique: Dict[str, DocBlock] = {}
         for c in chunks:
-            if c.id not in seen_ids:
-                unique.append(c)
-                seen_ids.add(c.id)
-        return unique
+            unique.setdefault(c.id, c)
+        return list(unique.values())
 
     def _format_ufl_table(self, rows: List[UFLRow]) -> str:
         if not rows:
             return "No structured facts found."
             
-        # Convert to DataFrame for pretty markdown printing
-        df = pd.DataFrame([r.model_dump() for r in rows])
-        
-        # Select and reorder columns for clarity in prompt
-        cols = ['row_id', 'metric_name', 'value', 'unit', 'period', 'nuance_note', 'source_chunk_id']
-        # Filter for only existing columns to avoid errors
-        cols = [c for c in cols if c in df.columns]
-        
-        table_md = df[cols].to_markdown(index=False)
-        return table_md
+        # Plain string builder: the tables are small, so a DataFrame + tabulate
+        # round-trip costs far more than the formatting itself.
+        getter = attrgetter(*UFL_COLS)
+        buf = io.StringIO()
+        buf.write("| " + " | ".join(UFL_COLS) + " |\n")
+        buf.write("|" + "---|" * len(UFL_COLS) + "\n")
+        for r in rows:
+            buf.write("| " + " | ".join(_fmt(v) for v in getter(r)) + " |\n")
+        return buf.getvalue().rstrip("\n")
 
     def _format_text_blocks(self, chunks: List[DocBlock]) -> str:
         if not chunks:
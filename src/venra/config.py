@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # Get the project root directory (assuming config.py is in src/venra)
@@ -17,6 +17,32 @@ class Settings(BaseSettings):
     SLM_MODEL_FAST: str = "llama-3.1-8b-instant"
     SLM_MODEL_PRECISION: str = "llama-3.3-70b-versatile"
     
+    # --- Groq Rate Limits (ingestion fan-out) ---
+    GROQ_CONCURRENCY: int = 8
+    GROQ_RPM: int = 30
+    # SDK-level retries (exponential backoff with jitter, honouring Retry-After) on 429/5xx/timeouts
+    GROQ_MAX_RETRIES: int = 4
+
+    # --- Table Melting (ingestion) ---
+    # Worker processes for melting tables; 0 = os.cpu_count(), 1 = melt inline
+    MELT_WORKERS: int = 0
+    # Below this many tables the pool's startup cost outweighs the parallelism
+    MELT_POOL_MIN_TABLES: int = 32
+    # Normalize table period headers once per document before melting
+    # (TableMelter.normalize_headers_batch: local rules first, then batched SLM calls).
+    # Off by default: it rewrites stored period values, and with them row ids.
+    TABLE_HEADER_NORMALIZATION: bool = False
+
+    # --- Text Extraction (ingestion) ---
+    # "BATCH" submits text extraction as one offline OpenAI Batch API job per document
+    INGEST_MODE: Literal["LIVE", "BATCH"] = "LIVE"
+    # Skip the LLM for text blocks that state no figure (TextSynthesizer._looks_factual)
+    TEXT_FACT_PREFILTER: bool = False
+    # Adjacent text blocks packed into one extraction prompt (1 = one call per block),
+    # capped by a rough character budget for the packed text
+    TEXT_BLOCKS_PER_CALL: int = 1
+    TEXT_PACK_MAX_CHARS: int = 12_000
+
     # --- Confidence Thresholds ---
     CONFIDENCE_TABLE: float = 0.95
     CONFIDENCE_TEXT_HIGH: float = 0.85
@@ -25,9 +51,32 @@ class Settings(BaseSettings):
     # --- Prompt Paths ---
     PROMPTS_PATH: str = str(PROJECT_ROOT / "assets" / "PROMPTS.md")
 
+    # --- Code Execution ---
+    EXECUTOR_TIMEOUT_S: float = 5.0
+
     # --- Storage ---
+    # Digest for block ids / UFL row ids / metric ids: "md5" (compatible with existing stores) or "blake2b"
+    ROW_ID_HASH: Literal["md5", "blake2b"] = "md5"
     DATA_DIR: str = str(PROJECT_ROOT / "data")
     CHROMA_DB_PATH: str = str(PROJECT_ROOT / "data" / "chroma_db")
+    CHROMA_ADD_BATCH: int = 256
+    # sentence-transformers model for the Chroma collections (None = Chroma's default);
+    # EMBEDDING_DEVICE None picks cuda when available. Needs `sentence-transformers`.
+    EMBEDDING_MODEL: Optional[str] = None
+    EMBEDDING_DEVICE: Optional[str] = None
+    # Load the embedding model with float16 weights when it runs on cuda
+    EMBEDDING_FP16: bool = True
+    # Parsed DOMs keyed by the PDF's content hash, so re-ingesting an identical filing
+    # skips LlamaParse (in-process LRU, then one JSON file per digest; off by default)
+    PARSE_CACHE_ENABLED: bool = False
+    PARSE_CACHE_DIR: str = str(PROJECT_ROOT / "data" / "parse_cache")
+    # Exact-match cache of deterministic extraction/resolution responses (off by default)
+    LLM_CACHE_ENABLED: bool = False
+    LLM_CACHE_PATH: str = str(PROJECT_ROOT / "data" / "llm_cache.db")
+    # Registry of resolved issuers keyed by CIK / registrant name; a cover page that
+    # matches a known entry skips the EntityResolver call (off by default)
+    KNOWN_ENTITIES_ENABLED: bool = False
+    KNOWN_ENTITIES_PATH: str = str(PROJECT_ROOT / "data" / "known_entities.json")
 
     model_config = SettingsConfigDict(
         env_file=".env",
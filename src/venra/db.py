@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Iterable, Optional
 from uuid import UUID, uuid4
+from sqlalchemy import event
 from sqlmodel import Field, SQLModel, create_engine, Session, select
 import json
 
@@ -22,7 +23,22 @@ class ChatSession(SQLModel, table=True):
 
 sqlite_file_name = "venra.db"
 sqlite_url = f"sqlite:///{sqlite_file_name}"
-engine = create_engine(sqlite_url, echo=False)
+# Default QueuePool: one SQLite connection per thread, safe to share across request threads.
+engine = create_engine(
+    sqlite_url,
+    echo=False,
+    connect_args={"check_same_thread": False, "timeout": 30}
+)
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the writer; NORMAL sync is crash-safe under WAL."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
 
 def init_db():
     SQLModel.metadata.create_all(engine)
@@ -31,6 +47,12 @@ def get_session():
     with Session(engine) as session:
         yield session
 
+def save_traces(traces: Iterable[Trace]):
+    """Inserts a batch of traces in a single transaction instead of one commit per trace."""
+    with Session(engine) as session:
+        session.add_all(list(traces))
+        session.commit()
+
 if __name__ == "__main__":
     init_db()
     print(f"Database {sqlite_file_name} initialized.")
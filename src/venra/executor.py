@@ -1,34 +1,118 @@
-import sys
 import io
+import types
+import asyncio
+import hashlib
+import marshal
+import pickle
+import threading
 import traceback
+import contextlib
+import multiprocessing
+from types import CodeType
 from typing import Dict, Any, Optional
+from cachetools import LRUCache
+from venra.config import settings
+
+# Snippets run in a child process so a runaway loop can be killed. forkserver children
+# don't inherit the server's threads (logging listener, HTTP/2 transport, Chroma).
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+def _run_in_child(code_bytes: bytes, context: Dict[str, Any], conn):
+    """Child process entry point: runs the marshaled bytecode and sends the result back."""
+    result = PythonExecutor.execute_sync(marshal.loads(code_bytes), context)
+    variables = {}
+    for k, v in result["variables"].items():
+        # Only values that survive the trip back to the parent (no modules, functions, ...)
+        if isinstance(v, types.ModuleType):
+            continue
+        try:
+            pickle.dumps(v)
+        except Exception:
+            continue
+        variables[k] = v
+    result["variables"] = variables
+    conn.send(result)
+    conn.close()
 
 class PythonExecutor:
     """
     Executes Python code in a controlled local environment.
-    Captures stdout and returns the result or error.
+    Captures printed output and returns the result or error.
     """
-    def execute(self, code: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def __init__(self, cache_size: int = 256):
+        # The LLM often re-emits identical snippets; reuse their bytecode.
+        self._code_cache: LRUCache = LRUCache(maxsize=cache_size)
+        self._cache_lock = threading.Lock()
+
+    def _compile(self, code: str) -> CodeType:
+        key = hashlib.blake2b(code.encode(), digest_size=16).digest()
+        with self._cache_lock:
+            compiled = self._code_cache.get(key)
+        if compiled is None:
+            compiled = compile(code, "<agent-pass1>", "exec")
+            with self._cache_lock:
+                self._code_cache[key] = compiled
+        return compiled
+
+    @staticmethod
+    def execute_sync(code: CodeType, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Runs compiled code in this process. sys.stdout is swapped, which is process-wide,
+        so this is meant for the dedicated child that execute() starts per snippet.
+        """
         context = context or {}
-        
-        # Redirect stdout
-        old_stdout = sys.stdout
         redirected_output = io.StringIO()
-        sys.stdout = redirected_output
-        
+
         error = None
         try:
             # We use exec but provide a restricted global scope
-            exec(code, {"__builtins__": __builtins__}, context)
+            with contextlib.redirect_stdout(redirected_output):
+                exec(code, {"__builtins__": __builtins__}, context)
         except Exception:
             error = traceback.format_exc()
-        finally:
-            sys.stdout = old_stdout
-            
+
         output = redirected_output.getvalue()
-        
+
         return {
             "output": output.strip(),
             "variables": {k: v for k, v in context.items() if not k.startswith("__")},
             "error": error
         }
+
+    def _run_isolated(self, code_bytes: bytes, context: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        recv_conn, send_conn = _MP_CONTEXT.Pipe(duplex=False)
+        proc = _MP_CONTEXT.Process(target=_run_in_child, args=(code_bytes, context, send_conn), daemon=True)
+        proc.start()
+        send_conn.close()
+        try:
+            if recv_conn.poll(timeout):
+                return recv_conn.recv()
+            return {
+                "output": "",
+                "variables": {},
+                "error": f"TimeoutError: code execution exceeded {timeout}s"
+            }
+        except EOFError:
+            # The snippet ended the process itself (sys.exit, os._exit, a crash)
+            return {"output": "", "variables": {}, "error": "ProcessError: code execution exited without a result"}
+        finally:
+            if proc.is_alive():
+                proc.kill()
+            proc.join()
+            recv_conn.close()
+
+    async def execute(self, code: str, context: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Runs the code in a child process, waited on from a worker thread so the event
+        loop stays free. On timeout the child is killed, so a runaway snippet stops
+        consuming CPU instead of lingering in the shared thread pool.
+        """
+        timeout = settings.EXECUTOR_TIMEOUT_S if timeout is None else timeout
+        try:
+            code_bytes = marshal.dumps(self._compile(code))
+        except SyntaxError:
+            return {"output": "", "variables": {}, "error": traceback.format_exc()}
+        return await asyncio.to_thread(self._run_isolated, code_bytes, context or {}, timeout)
@@ -0,0 +1,21 @@
+import hashlib
+from functools import partial
+from venra.config import settings
+
+# Stored ids are only content fingerprints, so any 128-bit digest will do;
+# md5 stays the default so ids match ledgers and Chroma stores written by earlier runs.
+# Schema-collection ids are the exception: they are seeded from the normalized metric
+# name, and ContextIndexer.index_ufl_schema migrates older per-spelling entries it meets.
+_HASHERS = {
+    "md5": hashlib.md5,
+    "blake2b": partial(hashlib.blake2b, digest_size=16),
+}
+
+def content_id(seed: str) -> str:
+    """32-char hex id for a DOM block, UFL row or metric, using settings.ROW_ID_HASH."""
+    return _HASHERS[settings.ROW_ID_HASH](seed.encode()).hexdigest()
+
+def file_digest(path: str) -> str:
+    """blake2b-128 hex digest of a file's bytes, read in chunks."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, partial(hashlib.blake2b, digest_size=16)).hexdigest()
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Optional
+import httpx
+from aiolimiter import AsyncLimiter
+from venra.config import settings
+
+# One pooled HTTP/2 client per process, shared by every LLM-facing component so
+# TLS handshakes are paid once and concurrent calls multiplex over warm connections.
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the shared AsyncClient, creating it on first use (or after it was closed)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0),
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    return _client
+
+async def close_http_client():
+    """Closes the shared client; called from the FastAPI shutdown hook."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# One Groq request-rate budget per process: every fan-out (text extraction, header
+# normalization, concurrent pipeline runs) draws from it, so together they stay under GROQ_RPM.
+_groq_limiter: Optional[AsyncLimiter] = None
+_groq_limiter_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_groq_limiter() -> AsyncLimiter:
+    """Returns the shared GROQ_RPM-per-minute limiter, rebuilt for a new event loop or rate."""
+    global _groq_limiter, _groq_limiter_loop
+    loop = asyncio.get_running_loop()
+    if _groq_limiter is None or _groq_limiter_loop is not loop or _groq_limiter.max_rate != settings.GROQ_RPM:
+        _groq_limiter = AsyncLimiter(settings.GROQ_RPM, 60)
+        _groq_limiter_loop = loop
+    return _groq_limiter
@@ -1,20 +1,63 @@
 import os
 import re
 import pickle
-from typing import List, Optional
-from llama_parse import LlamaParse
+import logging
+from typing import AsyncIterator, Iterator, List, Optional
+from cachetools import LRUCache
+from pydantic import TypeAdapter
+from pydantic_core import from_json
+from venra.config import settings
 from venra.models import DocBlock, TextBlock, TableBlock, BlockType
+from venra.hashing import content_id, file_digest
 from venra.logging_config import logger
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# One multiline scan splits a document into structural spans: an ATX header line, a
+# table run (lines containing "|", with blank lines allowed between them), or a text
+# run (every other line up to the next header or "|" line). Header lines never start
+# or continue a run. Spans are consumed whole by the regex engine, not line by line.
+_NOT_HEADER = r"(?!#+[^\S\n])"
+_BLOCK_RE = re.compile(
+    r"^(?P<hashes>#+)[^\S\n]+(?P<title>[^\n]*)"
+    rf"|^(?P<text>(?:{_NOT_HEADER}[^\n|]*\n)*{_NOT_HEADER}[^\n|]*$)"
+    rf"|^(?P<table>{_NOT_HEADER}[^\n|]*\|[^\n]*(?:\n(?:[^\S\n]*\n)*{_NOT_HEADER}[^\n|]*\|[^\n]*)*)",
+    re.M
+)
+
+# DOM (de)serialization: JSON via pydantic-core instead of pickle
+_DOM_ADAPTER = TypeAdapter(List[DocBlock])
+_BLOCK_CLASSES = {BlockType.TEXT: TextBlock, BlockType.TABLE: TableBlock}
+
+# Parsed DOMs by PDF content digest (PARSE_CACHE_ENABLED); the disk tier lives in PARSE_CACHE_DIR
+_PARSE_CACHE: LRUCache = LRUCache(maxsize=32)
+
+def _iter_lines(text: str) -> Iterator[str]:
+    """Yields the same lines as text.split("\\n") without materializing the whole list."""
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+def __getattr__(name: str):
+    # llama_parse is heavy; resolve it on first use while keeping venra.ingestion.LlamaParse addressable.
+    if name == "LlamaParse":
+        from llama_parse import LlamaParse
+        return LlamaParse
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 class StructuralParser:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("LLAMA_CLOUD_API_KEY")
         if not self.api_key:
             raise ValueError("LLAMA_CLOUD_API_KEY not found.")
-        
+
+        from llama_parse import LlamaParse
         self.parser = LlamaParse(
             api_key=self.api_key,
             result_type="markdown",
@@ -26,100 +69,116 @@ class StructuralParser:
     async def parse_pdf(self, file_path: str) -> List[DocBlock]:
         """
         Parses a PDF and returns a list of DocBlocks with section hierarchy.
+        With PARSE_CACHE_ENABLED, identical PDF bytes (under any filename) are parsed once:
+        later calls are served from memory, or from the DOM written to PARSE_CACHE_DIR.
         """
-        logger.info(f"Starting LlamaParse for: {file_path}")
+        if not settings.PARSE_CACHE_ENABLED:
+            return [block async for block in self.iter_blocks(file_path)]
+
+        digest = file_digest(file_path)
+        blocks = _PARSE_CACHE.get(digest)
+        if blocks is None:
+            cache_path = os.path.join(settings.PARSE_CACHE_DIR, f"{digest}.json")
+            if os.path.exists(cache_path):
+                logger.info("Parse cache hit for %s (%s)", file_path, digest)
+                blocks = self.load_dom(cache_path)
+            else:
+                blocks = [block async for block in self.iter_blocks(file_path)]
+                self.save_dom(blocks, cache_path)
+            _PARSE_CACHE[digest] = blocks
+        # Shallow copy: callers may reorder or extend their list
+        return list(blocks)
+
+    async def iter_blocks(self, file_path: str) -> AsyncIterator[DocBlock]:
+        """
+        Parses a PDF and yields DocBlocks as soon as each one is finalized,
+        so consumers can start work before the whole document is walked.
+        """
+        logger.info("Starting LlamaParse for: %s", file_path)
         # LlamaParse.aload_data returns a list of Document objects
         documents = await self.parser.aload_data(file_path)
-        
-        all_blocks = []
+
         header_stack = []
-        
         for doc in documents:
-            content = doc.text
-            # Simple line-by-line walker to track headers and content
-            lines = content.split("\n")
-            
-            current_chunk = []
-            
-            for line in lines:
-                header_match = re.match(r"^(#+)\s+(.*)", line)
-                if header_match:
-                    self._flush_chunk(current_chunk, header_stack, all_blocks)
-                    current_chunk = []
-                    
-                    level = len(header_match.group(1))
-                    title = header_match.group(2).strip()
-                    
-                    # Update header stack
-                    header_stack = header_stack[:level-1]
-                    header_stack.append(title)
-                    logger.debug(f"Header Stack: {header_stack}")
-                    continue
-
-                # Table line detection: more inclusive to keep table together
-                is_table_line = "|" in line
-                
-                if is_table_line:
-                    # If we were in a non-table chunk, flush it
-                    if current_chunk and not any("|" in l for l in current_chunk):
-                        self._flush_chunk(current_chunk, header_stack, all_blocks)
-                        current_chunk = []
-                else:
-                    # If we were in a table chunk, and this is a non-blank text line, flush it
-                    if line.strip() and current_chunk and any("|" in l for l in current_chunk):
-                        self._flush_chunk(current_chunk, header_stack, all_blocks)
-                        current_chunk = []
-                
-                current_chunk.append(line)
-            
-            # Final flush for the document
-            self._flush_chunk(current_chunk, header_stack, all_blocks)
-            current_chunk = []
-                    
-        return all_blocks
-
-    def _flush_chunk(self, lines: List[str], stack: List[str], all_blocks: List[DocBlock]):
-        if not lines:
-            return
-        content = "\n".join(lines).strip()
+            for block in self._walk_text(doc.text, header_stack):
+                yield block
+
+    def _walk_text(self, text: str, header_stack: List[str]) -> Iterator[DocBlock]:
+        """
+        Walks one document's markdown span by span (see _BLOCK_RE) to track headers
+        and content. header_stack is updated in place so section context carries
+        across documents.
+        """
+        for m in _BLOCK_RE.finditer(text):
+            kind = m.lastgroup
+            if kind == "text":
+                block = self._flush_chunk(m.group("text"), header_stack)
+            elif kind == "table":
+                # It's a table if it contains | AND a separator line
+                table = m.group("table")
+                block = self._flush_chunk(table, header_stack, has_pipe=True, has_separator="---" in table)
+            else:
+                level = len(m.group("hashes"))
+                title = m.group("title").strip()
+
+                # Update header stack
+                del header_stack[level-1:]
+                header_stack.append(title)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Header Stack: %s", header_stack)
+                continue
+            if block:
+                yield block
+
+    def _flush_chunk(self, chunk: str, stack: List[str],
+                     has_pipe: bool = False, has_separator: bool = False) -> Optional[DocBlock]:
+        content = chunk.strip()
         if not content:
-            return
+            return None
             
-        # Determine if it's a table: contains | AND a separator line or multiple pipes
-        has_pipe = any("|" in l for l in lines)
-        has_separator = any("|" in l and "---" in l for l in lines)
-        
         block = None
         if has_pipe and has_separator:
-            block = self._create_table_block(lines, stack)
+            block = self._create_table_block(content, stack)
         else:
-            block = self._create_text_block(lines, stack)
+            block = self._create_text_block(content, stack)
             
         # Generate unique ID based on content and path
-        import hashlib
         id_seed = f"{block.section_path}_{block.content}"
-        block.id = hashlib.md5(id_seed.encode()).hexdigest()
-        all_blocks.append(block)
+        block.id = content_id(id_seed)
+        return block
 
-    def _create_text_block(self, lines: List[str], stack: List[str]) -> TextBlock:
+    def _create_text_block(self, content: str, stack: List[str]) -> TextBlock:
         return TextBlock(
-            content="\n".join(lines).strip(),
+            content=content,
             section_path=list(stack)
         )
 
-    def _create_table_block(self, lines: List[str], stack: List[str]) -> TableBlock:
+    def _create_table_block(self, content: str, stack: List[str]) -> TableBlock:
         return TableBlock(
-            content="\n".join(lines).strip(),
+            content=content,
             section_path=list(stack)
         )
 
     def save_dom(self, blocks: List[DocBlock], output_path: str):
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         with open(output_path, "wb") as f:
-            pickle.dump(blocks, f)
-        logger.info(f"DOM saved to {output_path}")
+            f.write(_DOM_ADAPTER.dump_json(blocks))
+        logger.info("DOM saved to %s", output_path)
+
+    def migrate_pickled_dom(self, pickle_path: str, output_path: str) -> List[DocBlock]:
+        """
+        Loads a DOM cached by the old pickle format (<name>_dom.pkl) and rewrites it as
+        JSON at output_path, so documents parsed before the switch don't go back to LlamaParse.
+        Only for cache files this pipeline wrote itself: unpickling runs arbitrary code.
+        """
+        with open(pickle_path, "rb") as f:
+            blocks = pickle.load(f)
+        self.save_dom(blocks, output_path)
+        logger.info("Migrated pickled DOM %s to %s", pickle_path, output_path)
+        return blocks
 
     @staticmethod
     def load_dom(input_path: str) -> List[DocBlock]:
         with open(input_path, "rb") as f:
-            return pickle.load(f)
+            data = from_json(f.read())
+        return [_BLOCK_CLASSES[BlockType(d["block_type"])].model_validate(d) for d in data]
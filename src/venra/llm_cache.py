@@ -0,0 +1,53 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from venra.config import settings
+
+class LLMCache:
+    """
+    Exact-match cache for deterministic (temperature 0) LLM calls, persisted in SQLite
+    so ingestion reruns and repeated boilerplate blocks skip the round-trip.
+    Values are the validated response model's JSON.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.commit()
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, Any]]) -> str:
+        payload = json.dumps([model, messages], sort_keys=True, ensure_ascii=False)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO llm_cache (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache: Optional[LLMCache] = None
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Returns the process-wide cache, or None while LLM_CACHE_ENABLED is off."""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _cache is None or _cache.path != settings.LLM_CACHE_PATH:
+        _cache = LLMCache(settings.LLM_CACHE_PATH)
+    return _cache
@@ -1,11 +1,15 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
 
 def setup_logging():
     """
     Configures the project-wide logger.
-    Logs to console (INFO) and file (DEBUG).
+    Logs to console (INFO) and a rotating file (DEBUG). Records are handed to a
+    background QueueListener so request handlers never block on handler I/O.
     """
     log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     formatter = logging.Formatter(log_format)
@@ -18,15 +22,24 @@ def setup_logging():
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
     # File Handler
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
-    file_handler = logging.FileHandler(log_dir / "venra.log")
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_dir / "venra.log", maxBytes=50_000_000, backupCount=5
+    )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+
+    # Queue Handler: the only handler on the logger; the listener thread does the writes
+    log_queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
 
     return logger
 
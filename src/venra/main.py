@@ -1,14 +1,37 @@
-from fastapi import FastAPI
+import asyncio
+from functools import lru_cache
+from typing import List, Optional
+from fastapi import Depends, FastAPI
+from pydantic import BaseModel
 from venra.logging_config import logger
 from venra.db import init_db
+from venra.agent import ReasoningAgent
+from venra.http import close_http_client
 
 app = FastAPI(title="VeNRA: Verifiable Numerical Reasoning Agent")
 
+class QueryRequest(BaseModel):
+    """A batch of questions answered against one assembled context."""
+    questions: List[str]
+    context: str
+    session_id: Optional[str] = None
+
+@lru_cache(maxsize=None)
+def get_agent() -> ReasoningAgent:
+    """Process-wide agent singleton, shared by every request via Depends."""
+    return ReasoningAgent()
+
 @app.on_event("startup")
 def on_startup():
     logger.info("Initializing database...")
     init_db()
     logger.info("Database initialized.")
+    get_agent()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    get_agent.cache_clear()
+    await close_http_client()
 
 @app.get("/")
 def read_root():
@@ -18,3 +41,26 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/cache-stats")
+def cache_stats(agent: ReasoningAgent = Depends(get_agent)):
+    return agent.cache_stats()
+
+@app.post("/query")
+async def query(request: QueryRequest, agent: ReasoningAgent = Depends(get_agent)):
+    """
+    Answers every question concurrently; the agent never blocks the event loop,
+    so N questions cost roughly one round-trip instead of N.
+    """
+    results = await asyncio.gather(*[
+        agent.answer(q, request.context, session_id=request.session_id)
+        for q in request.questions
+    ])
+    return [
+        {
+            "question": q,
+            "final_response": r["final_response"],
+            "reasoning": r["reasoning"]
+        }
+        for q, r in zip(request.questions, results)
+    ]
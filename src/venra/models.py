@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from enum import Enum
 from typing import List, Optional, Union, Dict, Any, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from enum import Enum
 
 class BlockType(str, Enum):
@@ -23,6 +23,10 @@ class TableBlock(DocBlock):
     block_type: BlockType = BlockType.TABLE
 
 class UFLRow(BaseModel):
+    # Immutable once built: rows loaded back from parquet are trusted and
+    # rebuilt with model_construct (no re-validation); unknown columns are dropped.
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     row_id: str
     entity_id: str
     entity_name_raw: str
@@ -55,6 +59,13 @@ class ScrapedFact(BaseModel):
 class FactExtractionResponse(BaseModel):
     facts: List[ScrapedFact]
 
+class IndexedScrapedFact(ScrapedFact):
+    source_block_index: int = Field(..., description="The n of the [BLOCK n] the fact was read from.")
+
+class MultiBlockFactExtractionResponse(BaseModel):
+    """Facts from several text blocks extracted in one call, tagged with their source block."""
+    facts: List[IndexedScrapedFact]
+
 # --- Navigator Models ---
 
 class UFLFilter(BaseModel):
@@ -1,10 +1,12 @@
 import os
 import json
 from typing import Optional, Dict, Any
+import httpx
 import instructor
-from openai import OpenAI
+from openai import AsyncOpenAI
 from venra.models import RetrievalPlan
 from venra.config import settings
+from venra.http import get_http_client
 from venra.prompt_loader import load_prompt
 from venra.logging_config import logger
 
@@ -13,7 +15,8 @@ class Navigator:
     Translates natural language queries into structured RetrievalPlans.
     Uses schema_summary.json to map user intent to canonical metrics and entities.
     """
-    def __init__(self, api_key: Optional[str] = None, file_prefix: Optional[str] = None, schema_path: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, file_prefix: Optional[str] = None, schema_path: Optional[str] = None,
+                 http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key or settings.GROQ_API_KEY
         
         if schema_path:
@@ -24,9 +27,10 @@ class Navigator:
             self.schema_path = os.path.join(settings.DATA_DIR, "processed/schema_summary.json")
         
         self.client = instructor.from_openai(
-            OpenAI(
+            AsyncOpenAI(
                 base_url="https://api.groq.com/openai/v1",
-                api_key=self.api_key or "dummy_key"
+                api_key=self.api_key or "dummy_key",
+                http_client=http_client or get_http_client()
             ),
             mode=instructor.Mode.JSON
         )
@@ -36,7 +40,7 @@ class Navigator:
 
     def _load_schema(self) -> str:
         if not os.path.exists(self.schema_path):
-            logger.warning(f"Schema summary not found at {self.schema_path}. Navigator will run without schema context.")
+            logger.warning("Schema summary not found at %s. Navigator will run without schema context.", self.schema_path)
             return "No schema available."
         
         try:
@@ -45,14 +49,14 @@ class Navigator:
             self.entities = schema.get("entities", [])
             return json.dumps(schema, indent=2)
         except Exception as e:
-            logger.error(f"Failed to load schema: {e}")
+            logger.error("Failed to load schema: %s", e)
             return "Error loading schema."
 
     async def navigate(self, query: str) -> RetrievalPlan:
         """
         Generates a RetrievalPlan for a given user query.
         """
-        logger.info(f"Navigating query: {query}")
+        logger.info("Navigating query: %s", query)
         
         # Identify current document year from schema or entities
         current_year = "2025" # Default if not found
@@ -66,7 +70,7 @@ class Navigator:
         system_prompt = system_prompt.replace("{{last_year}}", last_year)
 
         try:
-            plan = self.client.chat.completions.create(
+            plan = await self.client.chat.completions.create(
                 model=self.model,
                 response_model=RetrievalPlan,
                 messages=[
@@ -75,10 +79,10 @@ class Navigator:
                 ],
                 temperature=0.0
             )
-            logger.info(f"Plan generated. Reasoning: {plan.reasoning}")
+            logger.info("Plan generated. Reasoning: %s", plan.reasoning)
             return plan
         except Exception as e:
-            logger.error(f"Navigation failed: {e}")
+            logger.error("Navigation failed: %s", e)
             # Fallback plan
             return RetrievalPlan(
                 ufl_query=None,
@@ -1,14 +1,30 @@
 import os
+import re
 import asyncio
-from typing import List, Optional
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional
 import pandas as pd
 from venra.ingestion import StructuralParser
-from venra.synthesis import EntityResolver, TableMelter, TextSynthesizer, ContextIndexer
+from venra.synthesis import EntityResolver, TableMelter, TextSynthesizer, ContextIndexer, _melt_one
 from venra.schema import SchemaGenerator
 from venra.models import BlockType, DocBlock, UFLRow
 from venra.logging_config import logger
 from venra.config import settings
 
+_YEAR_RE = re.compile(r"202[0-9]")
+
+def _looks_financial(content: str, min_digits: int = 5) -> bool:
+    """True if the text mentions money or has at least min_digits digits."""
+    if "$" in content:
+        return True
+    # str.count runs in C; only non-ASCII text (e.g. superscript footnote
+    # digits, which isdigit() also counts) needs the per-character scan.
+    if sum(map(content.count, "0123456789")) >= min_digits:
+        return True
+    return not content.isascii() and sum(c.isdigit() for c in content) >= min_digits
+
 class IngestionPipeline:
     def __init__(self):
         self.parser = StructuralParser()
@@ -16,12 +32,61 @@ class IngestionPipeline:
         self.indexer = ContextIndexer()
         self.schema_gen = SchemaGenerator(output_path=os.path.join(settings.DATA_DIR, "processed/schema_summary.json"))
 
-    async def run(self, pdf_path: str, skip_parsing: bool = False):
+    @staticmethod
+    def _melt_tables(melter: TableMelter, tables: List[DocBlock],
+                     header_maps: Optional[List[Dict[str, str]]] = None) -> List[List[UFLRow]]:
+        """
+        Melts tables across a process pool. melt() is pure given the block and the
+        entity, so tables map independently; results come back in input order.
+        Workers come from a forkserver (spawn where unavailable), never a plain fork:
+        this runs while the logging listener, indexing and HTTP/2 threads are live,
+        and a forked child can inherit one of their locks held.
+        """
+        header_maps = header_maps or [None] * len(tables)
+        workers = min(settings.MELT_WORKERS or os.cpu_count() or 1, len(tables))
+        if workers <= 1 or len(tables) < settings.MELT_POOL_MIN_TABLES:
+            return [melter.melt(b, m) for b, m in zip(tables, header_maps)]
+        logger.info("Melting %s tables across %s processes", len(tables), workers)
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method)) as pool:
+            return list(pool.map(
+                _melt_one, repeat(melter.entity_id), repeat(melter.entity_name_raw), tables, header_maps,
+                chunksize=4
+            ))
+
+    @classmethod
+    async def _normalize_and_melt(cls, melter: TableMelter, tables: List[DocBlock]) -> List[List[UFLRow]]:
+        """
+        Normalizes every table's headers in one document-wide pass (deduplicated, simple
+        headers resolved locally, the rest in batched SLM calls), then melts off the loop.
+        """
+        header_maps = None
+        if settings.TABLE_HEADER_NORMALIZATION and tables:
+            by_id = await melter.normalize_headers_batch({b.id: melter.table_headers(b) for b in tables})
+            header_maps = [by_id.get(b.id) for b in tables]
+        # Off the event loop: the pool (or inline melt) is blocking CPU work
+        return await asyncio.to_thread(cls._melt_tables, melter, tables, header_maps)
+
+    @staticmethod
+    async def _extract_text(text_synth: TextSynthesizer, candidates: List[DocBlock], context_str: str, use_batch_api: bool) -> List[List[UFLRow]]:
+        """Rows per candidate block, in input order, from the live API or one Batch API job."""
+        if use_batch_api:
+            by_id = await text_synth.extract_facts_batch(candidates, context_str=context_str)
+            return [by_id.get(b.id, []) for b in candidates]
+        return await text_synth.extract_facts_many(candidates, context_str=context_str)
+
+    async def run(self, pdf_path: str, skip_parsing: bool = False, use_batch_api: Optional[bool] = None):
         """
         Runs the full ingestion pipeline: PDF -> DOM -> UFL -> Vector DB -> Schema Summary.
+        With use_batch_api, text extraction is submitted as one offline Batch API job
+        (cheaper, higher throughput, but may take up to the 24h completion window).
+        Left as None, it follows settings.INGEST_MODE.
         """
+        if use_batch_api is None:
+            use_batch_api = settings.INGEST_MODE == "BATCH"
         base_name = os.path.basename(pdf_path).replace(".pdf", "")
-        dom_path = os.path.join(settings.DATA_DIR, "processed", f"{base_name}_dom.pkl")
+        dom_path = os.path.join(settings.DATA_DIR, "processed", f"{base_name}_dom.json")
+        legacy_dom_path = os.path.join(settings.DATA_DIR, "processed", f"{base_name}_dom.pkl")
         ufl_path = os.path.join(settings.DATA_DIR, "processed", f"{base_name}_ufl.parquet")
         schema_path = os.path.join(settings.DATA_DIR, "processed", f"{base_name}_schema_summary.json")
         
@@ -30,74 +95,96 @@ class IngestionPipeline:
 
         # 0. Check if UFL already exists and we want to skip
         if skip_parsing and os.path.exists(ufl_path):
-            logger.info(f"UFL already exists at {ufl_path}. Skipping extraction.")
+            logger.info("UFL already exists at %s. Skipping extraction.", ufl_path)
             df = pd.read_parquet(ufl_path)
-            all_ufl_rows = [UFLRow(**r) for r in df.to_dict('records')]
+            # Trusted: the ledger was validated on write. NaN cells map back to None.
+            records = df.astype(object).where(df.notna(), None).to_dict('records')
+            all_ufl_rows = [UFLRow.model_construct(**r) for r in records]
             
             # Ensure schema summary is generated if missing or for consistency
             if not os.path.exists(schema_path):
-                logger.info(f"Regenerating missing schema summary from existing UFL...")
+                logger.info("Regenerating missing schema summary from existing UFL...")
                 self.schema_gen.add_rows(all_ufl_rows)
                 self.schema_gen.save()
             return all_ufl_rows
 
         # 1. Structural Parsing
         if skip_parsing and os.path.exists(dom_path):
-            logger.info(f"Loading existing DOM from {dom_path}")
+            logger.info("Loading existing DOM from %s", dom_path)
             blocks = StructuralParser.load_dom(dom_path)
+        elif skip_parsing and os.path.exists(legacy_dom_path):
+            blocks = self.parser.migrate_pickled_dom(legacy_dom_path, dom_path)
         else:
-            logger.info(f"Parsing PDF: {pdf_path}")
+            logger.info("Parsing PDF: %s", pdf_path)
             blocks = await self.parser.parse_pdf(pdf_path)
             self.parser.save_dom(blocks, dom_path)
 
-        # 2. Entity Resolution
-        entity_meta = await self.resolver.resolve_entity(blocks)
-        self.schema_gen.add_entity(entity_meta)
-        
-        # Determine Current Year from cover page context or metadata
-        # Simple heuristic: look for 4-digit numbers in the first 20 blocks
-        current_year = "UNKNOWN"
-        for b in blocks[:20]:
-            match = re.search(r"202[0-9]", b.content)
-            if match:
-                current_year = match.group(0)
-                break
-        
-        context_str = f"Registrant: {entity_meta.official_name}. Current Fiscal Year: {current_year}. Dollars in millions unless specified."
-        logger.info(f"Using Global Context: {context_str}")
+        # Steps 2-3 run as one TaskGroup: chunk indexing doesn't need the entity, and
+        # table melting (CPU, off-loop) overlaps the LLM-bound text extraction. A failure
+        # in any of them cancels the rest instead of leaving orphaned work behind.
+        async with asyncio.TaskGroup() as tg:
+            # Index text blocks in ChromaDB
+            tg.create_task(self.indexer.aindex_blocks(blocks))
 
-        # 3. Knowledge Synthesis (UFL & Vector Indexing)
-        melter = TableMelter(entity_id=entity_meta.canonical_id, entity_name_raw=entity_meta.official_name)
-        text_synth = TextSynthesizer(entity_id=entity_meta.canonical_id, entity_name_raw=entity_meta.official_name)
-        
-        all_ufl_rows = []
-
-        # Index text blocks in ChromaDB
-        self.indexer.index_blocks(blocks)
-
-        for block in blocks:
-            if block.block_type == BlockType.TABLE:
-                logger.info(f"Processing table in {block.section_path}")
-                table_rows = melter.melt(block)
-                all_ufl_rows.extend(table_rows)
-            elif block.block_type == BlockType.TEXT:
-                # OPTIMIZATION: Only extract facts from text that looks like it has financial substance
-                content = block.content
-                has_money = "$" in content
-                digits = sum(c.isdigit() for c in content)
-                
-                if has_money or digits > 4:
-                    logger.info(f"Extracting facts from text in {block.section_path[:2]}...")
-                    text_facts = await text_synth.extract_facts(block, context_str=context_str)
-                    all_ufl_rows.extend(text_facts)
-                    # Small sleep to avoid hitting Groq TPM limits too hard
-                    await asyncio.sleep(0.5)
+            # 2. Entity Resolution
+            entity_meta = await self.resolver.resolve_entity(blocks)
+            self.schema_gen.add_entity(entity_meta)
+            
+            # Determine Current Year from cover page context or metadata
+            # Simple heuristic: look for 4-digit numbers in the first 20 blocks
+            cover = "\n".join(b.content for b in blocks[:20])
+            match = _YEAR_RE.search(cover)
+            current_year = match.group(0) if match else "UNKNOWN"
+            
+            context_str = f"Registrant: {entity_meta.official_name}. Current Fiscal Year: {current_year}. Dollars in millions unless specified."
+            logger.info("Using Global Context: %s", context_str)
+
+            # 3. Knowledge Synthesis (UFL & Vector Indexing)
+            melter = TableMelter(entity_id=entity_meta.canonical_id, entity_name_raw=entity_meta.official_name)
+            text_synth = TextSynthesizer(entity_id=entity_meta.canonical_id, entity_name_raw=entity_meta.official_name)
+
+            # Split tables from the text blocks worth an LLM call.
+            # One slot per block keeps the UFL rows in document order.
+            block_rows: List[List[UFLRow]] = [[] for _ in blocks]
+            table_idx = []
+            text_candidates = []
+            for i, block in enumerate(blocks):
+                if block.block_type == BlockType.TABLE:
+                    logger.info("Processing table in %s", block.section_path)
+                    table_idx.append(i)
+                elif block.block_type == BlockType.TEXT:
+                    # OPTIMIZATION: Only extract facts from text that looks like it has financial substance
+                    if _looks_financial(block.content) and (
+                        not settings.TEXT_FACT_PREFILTER or TextSynthesizer._looks_factual(block.content)
+                    ):
+                        text_candidates.append(i)
+
+            melt_task = tg.create_task(
+                self._normalize_and_melt(melter, [blocks[i] for i in table_idx])
+            )
+            # Facts from the candidates, live or as one offline batch job
+            candidates = [blocks[i] for i in text_candidates]
+            extract_task = tg.create_task(
+                self._extract_text(text_synth, candidates, context_str, use_batch_api)
+            )
+
+        for i, rows in zip(table_idx, melt_task.result()):
+            block_rows[i] = rows
+        for i, rows in zip(text_candidates, extract_task.result()):
+            block_rows[i] = rows
+
+        all_ufl_rows = [row for rows in block_rows for row in rows]
+
+        # Link each chunk to the rows extracted from it, in one batched update per document
+        links = {blocks[i].id: [r.row_id for r in rows] for i, rows in enumerate(block_rows) if rows}
+        await asyncio.to_thread(self.indexer.update_chunk_linkages, links)
 
         # 4. Save UFL to Parquet
         if all_ufl_rows:
-            df = pd.DataFrame([r.dict() for r in all_ufl_rows])
-            df.to_parquet(ufl_path, index=False)
-            logger.info(f"UFL saved to {ufl_path} ({len(df)} rows)")
+            # Columnar build: one list per field instead of one dict per row
+            df = pd.DataFrame({f: [getattr(r, f) for r in all_ufl_rows] for f in UFLRow.model_fields})
+            df.to_parquet(ufl_path, index=False, engine="pyarrow", compression="zstd")
+            logger.info("UFL saved to %s (%s rows)", ufl_path, len(df))
         
         # 5. Schema Summary Generation
         self.schema_gen.add_rows(all_ufl_rows)
@@ -109,9 +196,9 @@ class IngestionPipeline:
 if __name__ == "__main__":
     import sys
     if len(sys.argv) < 2:
-        print("Usage: python -m venra.pipeline <pdf_path>")
+        print("Usage: python -m venra.pipeline <pdf_path> [--batch]")
         sys.exit(1)
         
     pdf_path = sys.argv[1]
     pipeline = IngestionPipeline()
-    asyncio.run(pipeline.run(pdf_path))
+    asyncio.run(pipeline.run(pdf_path, use_batch_api=True if "--batch" in sys.argv[2:] else None))
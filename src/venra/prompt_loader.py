@@ -1,48 +1,83 @@
 import os
 import re
-from typing import Optional
+import sys
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 from venra.config import settings
 from venra.logging_config import logger
 
+_ID_TAG_RE = re.compile(r"\*\*ID:\*\* `([^`]+)`")
+_SECTION_END_RE = re.compile(r"\n##")
+
+# Headings searched when a prompt has no **ID:** tag
+_HEADING_FALLBACKS = {
+    "extract_financial_facts": "## Text Extraction (System Prompt)",
+    "navigator_system_prompt": "## Query Navigation (System Prompt)",
+    "agent_pass_1_reasoning": "## Reasoning Agent: Pass 1 (Logic & Code)",
+    "agent_pass_2_synthesis": "## Reasoning Agent: Pass 2 (Synthesis)",
+    "assembler_instructions": "## Reasoning Instructions (Assembler Context)"
+}
+
+@lru_cache(maxsize=4)
+def _index_prompts(path: str, stamp: Tuple[int, int]) -> Tuple[str, Dict[str, str]]:
+    """
+    Reads the prompts file once per (path, mtime/size stamp) and maps every **ID:** tag
+    to its section body (up to the next heading), in a single pass over the file.
+    """
+    with open(path, "r") as f:
+        content = f.read()
+    prompts_by_id = {}
+    for match in _ID_TAG_RE.finditer(content):
+        end = _SECTION_END_RE.search(content, match.end())
+        body = content[match.end():end.start() if end else len(content)]
+        prompts_by_id.setdefault(match.group(1), body.strip())
+    return content, prompts_by_id
+
+@lru_cache(maxsize=256)
+def _find_prompt(path: str, stamp: Tuple[int, int], prompt_id: str) -> Optional[str]:
+    """The interned prompt body for prompt_id in this version of the file, or None."""
+    content, prompts_by_id = _index_prompts(path, stamp)
+
+    # Try to find the prompt by the ID tag first: **ID:** `prompt_id`
+    if prompt_id in prompts_by_id:
+        return sys.intern(prompts_by_id[prompt_id])
+
+    # Fallback to heading match if ID not found (though we added IDs)
+    heading = _HEADING_FALLBACKS.get(prompt_id)
+    if heading:
+        start = content.find(heading)
+        if start != -1:
+            start += len(heading)
+            end = _SECTION_END_RE.search(content, start)
+            return sys.intern(content[start:end.start() if end else len(content)].strip())
+    return None
+
 def load_prompt(prompt_id: str) -> str:
     """
     Loads a specific prompt from assets/PROMPTS.md by its heading or ID.
+    Results are cached per settings.PROMPTS_PATH and file version (mtime, size), so an
+    edited or re-pointed file is picked up on the next call; failures are not cached.
+    Loaded prompts are interned, so every consumer shares one string object.
     """
+    path = settings.PROMPTS_PATH
     try:
-        if not os.path.exists(settings.PROMPTS_PATH):
-            logger.error(f"Prompts file not found at {settings.PROMPTS_PATH}")
-            return ""
-
-        with open(settings.PROMPTS_PATH, "r") as f:
-            content = f.read()
-
-        # Try to find the prompt by the ID tag first: **ID:** `prompt_id`
-        pattern = rf"\*\*ID:\*\* `{prompt_id}`(.*?)(?=\n##|$)"
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if match:
-            return match.group(1).strip()
-        
-        # Fallback to heading match if ID not found (though we added IDs)
-        heading_map = {
-            "extract_financial_facts": "## Text Extraction (System Prompt)",
-            "navigator_system_prompt": "## Query Navigation (System Prompt)",
-            "agent_pass_1_reasoning": "## Reasoning Agent: Pass 1 (Logic & Code)",
-            "agent_pass_2_synthesis": "## Reasoning Agent: Pass 2 (Synthesis)",
-            "assembler_instructions": "## Reasoning Instructions (Assembler Context)"
-        }
-        
-        heading = heading_map.get(prompt_id)
-        if heading:
-            heading_escaped = re.escape(heading)
-            pattern = rf"{heading_escaped}(.*?)(?=\n##|$)"
-            match = re.search(pattern, content, re.DOTALL)
-            if match:
-                return match.group(1).strip()
-
-        logger.warning(f"Prompt with ID '{prompt_id}' not found in {settings.PROMPTS_PATH}")
+        st = os.stat(path)
+    except FileNotFoundError:
+        logger.error("Prompts file not found at %s", path)
         return ""
 
+    try:
+        prompt = _find_prompt(path, (st.st_mtime_ns, st.st_size), prompt_id)
     except Exception as e:
-        logger.error(f"Error loading prompt '{prompt_id}': {e}")
+        logger.error("Error loading prompt '%s': %s", prompt_id, e)
         return ""
+
+    if prompt is None:
+        logger.warning("Prompt with ID '%s' not found in %s", prompt_id, path)
+        return ""
+    return prompt
+
+def clear_prompt_cache():
+    """Drops the parsed prompts file and loaded prompts."""
+    _find_prompt.cache_clear()
+    _index_prompts.cache_clear()
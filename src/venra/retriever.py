@@ -1,14 +1,28 @@
 import os
 import json
+import asyncio
 import hashlib
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from collections import Counter
-import chromadb
+from cachetools import LRUCache
 from venra.models import RetrievalPlan, UFLRow, DocBlock, BlockType
 from venra.config import settings
+from venra.vector_store import get_chroma_client, get_embedding_function
 from venra.logging_config import logger
 
+# Columns _query_ufl filters on; stored as categoricals after load
+UFL_FILTER_COLS = ("entity_id", "metric_name", "period")
+
+# Columns read from the ledger parquet; anything else in the file is never materialized
+UFL_COLUMNS = tuple(UFLRow.model_fields)
+
+# Loaded ledgers shared by every DualRetriever in the process (read-only after load)
+_UFL_CACHE: LRUCache = LRUCache(maxsize=8)
+
 class DualRetriever:
     """
     Implements Step 1: Parallel retrieval from UFL and Vector Store 
@@ -23,16 +37,81 @@ class DualRetriever:
             self.ufl_path = os.path.join(settings.DATA_DIR, "processed/ufl.parquet")
             
         self.db_path = db_path or settings.CHROMA_DB_PATH
-        
-        if os.path.exists(self.ufl_path):
-            self.df = pd.read_parquet(self.ufl_path)
-            logger.info(f"Retriever loaded UFL with {len(self.df)} rows.")
-        else:
-            self.df = pd.DataFrame()
-            logger.warning(f"UFL file not found at {self.ufl_path}.")
+        # The ledger is read on first access to .df, not at construction
+        self._df: Optional[pd.DataFrame] = None
+        self._chunk_index: Dict[str, np.ndarray] = {}
+
+        self.chroma_client = get_chroma_client(self.db_path)
+        embedding_fn = get_embedding_function()
+        self.text_collection = self.chroma_client.get_or_create_collection(
+            "venra_text_chunks", **({"embedding_function": embedding_fn} if embedding_fn else {})
+        )
 
-        self.chroma_client = chromadb.PersistentClient(path=self.db_path)
-        self.text_collection = self.chroma_client.get_or_create_collection("venra_text_chunks")
+    @property
+    def df(self) -> pd.DataFrame:
+        """The UFL ledger, loaded on first use."""
+        if self._df is None:
+            if os.path.exists(self.ufl_path):
+                self._df, self._chunk_index = self._load_ufl(self.ufl_path)
+                logger.info("Retriever loaded UFL with %s rows.", len(self._df))
+            else:
+                self._df = pd.DataFrame()
+                logger.warning("UFL file not found at %s.", self.ufl_path)
+        return self._df
+
+    @classmethod
+    def _load_ufl(cls, path: str) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+        """
+        Loads and indexes a UFL parquet, sharing the result across retrievers.
+        Only the UFLRow columns are read from the file. Returns the frame and its
+        source_chunk_id -> row positions index.
+        Entries are keyed by (path, mtime, size) so a rewritten ledger is reloaded.
+        """
+        try:
+            st = os.stat(path)
+            key = (path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            key = None
+        if key is not None:
+            cached = _UFL_CACHE.get(key)
+            if cached is not None:
+                return cached
+        df = cls._index_frame(pd.read_parquet(path, columns=cls._ufl_columns(path)))
+        loaded = (df, cls._chunk_positions(df))
+        if key is not None:
+            _UFL_CACHE[key] = loaded
+        return loaded
+
+    @staticmethod
+    def _ufl_columns(path: str) -> Optional[List[str]]:
+        """
+        UFLRow columns present in the parquet footer (older ledgers may lack the
+        optional ones). None, i.e. read everything, if the footer can't be read.
+        """
+        try:
+            present = set(pq.read_schema(path).names)
+        except (OSError, pa.ArrowException):
+            return None
+        return [c for c in UFL_COLUMNS if c in present]
+
+    @staticmethod
+    def _chunk_positions(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Row positions per source chunk, so Expansion C is a lookup, not a scan."""
+        if df.empty or "source_chunk_id" not in df.columns:
+            return {}
+        return df.groupby("source_chunk_id", sort=False, observed=True).indices
+
+    @staticmethod
+    def _index_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Stores the filter columns as categoricals. A ledger repeats a small set of
+        entities, metrics and periods, so isin/str.contains only evaluate each
+        distinct value once and map the result back through the codes.
+        """
+        for col in UFL_FILTER_COLS:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+        return df
 
     async def retrieve(self, 
                        plan: RetrievalPlan, 
@@ -42,11 +121,16 @@ class DualRetriever:
         """
         Executes dual retrieval with specific expansion logic.
         """
-        logger.info(f"Starting retrieval for query: {plan.vector_hypothesis[:50]}... (k={k})")
+        logger.info("Starting retrieval for query: %s... (k=%s)", plan.vector_hypothesis[:50], k)
         
+        # 2. DIRECT UFL QUERY (runs first: its related entities feed the batched vector query)
+        # Look for candidates in the ledger based on clues
+        selected_ufl_rows = self._query_ufl(plan.ufl_query) if plan.ufl_query else []
+        row_id_map = {r.row_id: r for r in selected_ufl_rows}
+
         # 1. CORE SIMILARITY (The Foundation)
         # Always start with the chunks most similar to the Navigator's hypothesis
-        selected_chunks = self._query_vector(plan.vector_hypothesis, k=k)
+        vector_queries = [(plan.vector_hypothesis, k)]
         
         # 1b. KEYWORD BOOST (New)
         # Also search using the extracted keywords to catch exact matches missed by semantic search
@@ -54,24 +138,22 @@ class DualRetriever:
         effective_k_keywords = max(k, 5)
         if plan.vector_keywords:
             keyword_query = " ".join(plan.vector_keywords)
-            logger.info(f"Keyword Boost Search: '{keyword_query}' (k={effective_k_keywords})")
-            keyword_chunks = self._query_vector(keyword_query, k=effective_k_keywords)
-            selected_chunks.extend(keyword_chunks)
-
-        chunk_id_map = {c.id: c for c in selected_chunks}
-        
-        # 2. DIRECT UFL QUERY
-        # Look for candidates in the ledger based on clues
-        selected_ufl_rows = self._query_ufl(plan.ufl_query) if plan.ufl_query else []
-        row_id_map = {r.row_id: r for r in selected_ufl_rows}
+            logger.info("Keyword Boost Search: '%s' (k=%s)", keyword_query, effective_k_keywords)
+            vector_queries.append((keyword_query, effective_k_keywords))
 
         # 3. EXPANSION LOGIC
         
         # Expansion A: Related Entity Pivoting (Always on)
         # If UFL rows mention a related entity (e.g. "VPoC"), fetch chunks about it
         related_entities = list(set([r.related_entity_id for r in selected_ufl_rows if r.related_entity_id]))
-        for entity in related_entities:
-            entity_chunks = self._query_vector(f"Information about {entity}", k=2)
+        vector_queries.extend((f"Information about {entity}", 2) for entity in related_entities)
+
+        # One Chroma round-trip for every similarity search above
+        vector_results = await self._query_vectors(vector_queries)
+        num_core = 2 if plan.vector_keywords else 1
+        selected_chunks = [c for chunks in vector_results[:num_core] for c in chunks]
+        chunk_id_map = {c.id: c for c in selected_chunks}
+        for entity_chunks in vector_results[num_core:]:
             for ec in entity_chunks:
                 if ec.id not in chunk_id_map:
                     chunk_id_map[ec.id] = ec
@@ -82,26 +164,29 @@ class DualRetriever:
             source_counts = Counter([r.source_chunk_id for r in selected_ufl_rows])
             # Filter out chunks already found via similarity
             new_candidate_ids = [cid for cid, count in source_counts.most_common() if cid not in chunk_id_map]
-            # Add top 3 most frequent sources
-            for cid in new_candidate_ids[:3]:
-                expanded_chunk = self._fetch_chunks_by_ids([cid])
-                if expanded_chunk:
-                    chunk_id_map[cid] = expanded_chunk[0]
+            # Add top 3 most frequent sources (one batched get, kept in frequency order)
+            top_ids = new_candidate_ids[:3]
+            fetched = {c.id: c for c in await self._fetch_chunks_by_ids(top_ids)}
+            for cid in top_ids:
+                if cid in fetched:
+                    chunk_id_map[cid] = fetched[cid]
 
         # Expansion C: Chunk -> UFL (Completeness)
         # If enabled, fetch ALL UFL rows that were extracted from the current set of chunks
         if include_all_ufl_for_chunks and chunk_id_map:
-            current_chunk_ids = list(chunk_id_map.keys())
-            expanded_rows = self.df[self.df['source_chunk_id'].isin(current_chunk_ids)]
-            for _, er in expanded_rows.iterrows():
-                row_obj = UFLRow(**er.to_dict())
+            df = self.df
+            hits = [self._chunk_index[cid] for cid in chunk_id_map if cid in self._chunk_index]
+            # Sorted back into ledger order, as a boolean-mask filter would return them
+            positions = np.sort(np.concatenate(hits)) if hits else np.array([], dtype=np.intp)
+            expanded_rows = df.iloc[positions]
+            for row_obj in self._to_ufl_rows(expanded_rows):
                 if row_obj.row_id not in row_id_map:
                     row_id_map[row_obj.row_id] = row_obj
 
         final_rows = list(row_id_map.values())
         final_chunks = list(chunk_id_map.values())
 
-        logger.info(f"Retrieval complete: {len(final_rows)} UFL rows, {len(final_chunks)} text chunks.")
+        logger.info("Retrieval complete: %s UFL rows, %s text chunks.", len(final_rows), len(final_chunks))
         
         return {
             "ufl_rows": final_rows,
@@ -114,40 +199,93 @@ class DualRetriever:
         }
 
     def _query_ufl(self, filter_spec: Any) -> List[UFLRow]:
-        if self.df.empty: return []
-        mask = pd.Series(True, index=self.df.index)
+        # An empty filter selects nothing rather than copying out the whole ledger
+        if not (filter_spec.entity_ids or filter_spec.years or filter_spec.metric_keywords):
+            return []
+        df = self.df
+        if df.empty: return []
+        masks = []
         if filter_spec.entity_ids:
-            mask &= self.df['entity_id'].isin(filter_spec.entity_ids)
+            masks.append(df['entity_id'].isin(filter_spec.entity_ids).to_numpy())
         if filter_spec.years:
-            mask &= self.df['period'].str.contains('|'.join(filter_spec.years), na=False)
+            masks.append(self._contains_any(df['period'], filter_spec.years))
             
         if filter_spec.metric_keywords:
-            metric_mask = self.df['metric_name'].isin(filter_spec.metric_keywords)
+            metric_mask = df['metric_name'].isin(filter_spec.metric_keywords).to_numpy()
             if not metric_mask.any():
-                pattern = '|'.join([f".*{m}.*" for m in filter_spec.metric_keywords])
-                metric_mask = self.df['metric_name'].str.contains(pattern, case=False, na=False)
-            mask &= metric_mask
-            
-        results = self.df[mask]
-        return [UFLRow(**r.to_dict()) for _, r in results.iterrows()]
+                metric_mask = self._contains_any(df['metric_name'], filter_spec.metric_keywords)
+            masks.append(metric_mask)
 
-    def _query_vector(self, hypothesis: str, k: int = 3) -> List[DocBlock]:
-        results = self.text_collection.query(query_texts=[hypothesis], n_results=k)
-        blocks = []
-        if not results['ids'] or not results['ids'][0]: return []
-        for i in range(len(results['ids'][0])):
-            blocks.append(DocBlock(
-                id=results['ids'][0][i],
-                content=results['documents'][0][i],
-                block_type=BlockType(results['metadatas'][0][i]['block_type']),
-                section_path=json.loads(results['metadatas'][0][i]['section_path']),
-                page_num=results['metadatas'][0][i].get('page_num')
-            ))
-        return blocks
+        mask = np.logical_and.reduce(masks)
+        return self._to_ufl_rows(df.iloc[np.flatnonzero(mask)])
+
+    @staticmethod
+    def _contains_any(col: pd.Series, needles: List[str]) -> np.ndarray:
+        """
+        Case-insensitive literal substring match against any needle. Matching runs
+        over the distinct labels (regex=False: plain str.find, no regex engine) and
+        is mapped back to rows through the categorical codes.
+        """
+        cat = col if isinstance(col.dtype, pd.CategoricalDtype) else col.astype("category")
+        labels = cat.cat.categories.str.lower()
+        if len(labels) == 0:
+            return np.zeros(len(cat), dtype=bool)
+        hit = np.zeros(len(labels), dtype=bool)
+        for needle in needles:
+            hit |= labels.str.contains(needle.lower(), regex=False)
+        codes = cat.cat.codes.to_numpy()
+        # Code -1 is a missing cell
+        return hit[codes] & (codes >= 0)
+
+    @staticmethod
+    def _to_ufl_rows(frame: pd.DataFrame) -> List[UFLRow]:
+        """
+        Converts a UFL slice in one to_dict pass; missing cells (NaN) become None.
+        The ledger was validated when it was written, so rows skip re-validation.
+        """
+        if frame.empty: return []
+        records = frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+        return [UFLRow.model_construct(**r) for r in records]
+
+    async def _query_vector(self, hypothesis: str, k: int = 3) -> List[DocBlock]:
+        return (await self._query_vectors([(hypothesis, k)]))[0]
+
+    async def _query_vectors(self, queries: List[Tuple[str, int]]) -> List[List[DocBlock]]:
+        """
+        Runs several similarity searches as one batched Chroma query.
+        Each query is asked for the largest k and trimmed to its own k afterwards.
+        Chroma's client is synchronous (embedding + HNSW search), so it runs in a
+        worker thread instead of blocking the event loop.
+        """
+        results = await asyncio.to_thread(
+            self.text_collection.query,
+            query_texts=[q for q, _ in queries],
+            n_results=max(k for _, k in queries)
+        )
+        all_ids = results['ids'] or []
+        batches = []
+        for i, (_, k) in enumerate(queries):
+            if i >= len(all_ids) or not all_ids[i]:
+                batches.append([])
+                continue
+            ids = all_ids[i][:k]
+            documents = results['documents'][i]
+            metadatas = results['metadatas'][i]
+            batches.append([
+                DocBlock(
+                    id=ids[j],
+                    content=documents[j],
+                    block_type=BlockType(metadatas[j]['block_type']),
+                    section_path=json.loads(metadatas[j]['section_path']),
+                    page_num=metadatas[j].get('page_num')
+                )
+                for j in range(len(ids))
+            ])
+        return batches
 
-    def _fetch_chunks_by_ids(self, ids: List[str]) -> List[DocBlock]:
+    async def _fetch_chunks_by_ids(self, ids: List[str]) -> List[DocBlock]:
         if not ids: return []
-        results = self.text_collection.get(ids=ids)
+        results = await asyncio.to_thread(self.text_collection.get, ids=ids)
         blocks = []
         for i in range(len(results['ids'])):
             blocks.append(DocBlock(
@@ -1,6 +1,7 @@
-import json
 import os
+from collections import Counter
 from typing import List, Dict, Any
+from pydantic_core import from_json, to_json
 from venra.models import UFLRow, EntityMetadata
 from venra.logging_config import logger
 
@@ -12,7 +13,7 @@ class SchemaGenerator:
     def __init__(self, output_path: str = "data/processed/schema_summary.json"):
         self.output_path = output_path
         self.entities: Dict[str, Dict[str, Any]] = {}
-        self.metrics: Dict[str, int] = {}
+        self.metrics: Counter = Counter()
 
     def add_entity(self, entity: EntityMetadata):
         if entity.canonical_id not in self.entities:
@@ -21,17 +22,15 @@ class SchemaGenerator:
                 "official_name": entity.official_name,
                 "aliases": entity.aliases
             }
-            logger.debug(f"Added entity to schema: {entity.canonical_id}")
+            logger.debug("Added entity to schema: %s", entity.canonical_id)
 
     def add_rows(self, rows: List[UFLRow]):
-        for row in rows:
-            # Track metric frequency
-            self.metrics[row.metric_name] = self.metrics.get(row.metric_name, 0) + 1
+        # Track metric frequency
+        self.metrics.update(row.metric_name for row in rows)
 
     def save(self):
-        # Sort metrics by frequency and take top 500
-        sorted_metrics = sorted(self.metrics.items(), key=lambda x: x[1], reverse=True)
-        top_metrics = [m[0] for m in sorted_metrics[:500]]
+        # Top 500 metrics by frequency (ties keep first-seen order)
+        top_metrics = [m for m, _ in self.metrics.most_common(500)]
 
         schema_data = {
             "entities": list(self.entities.values()),
@@ -39,12 +38,13 @@ class SchemaGenerator:
         }
 
         os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
-        with open(self.output_path, "w") as f:
-            json.dump(schema_data, f, indent=2)
+        # pydantic-core's serializer writes UTF-8 bytes directly
+        with open(self.output_path, "wb") as f:
+            f.write(to_json(schema_data, indent=2))
         
-        logger.info(f"Schema summary saved to {self.output_path} ({len(top_metrics)} metrics, {len(self.entities)} entities)")
+        logger.info("Schema summary saved to %s (%s metrics, %s entities)", self.output_path, len(top_metrics), len(self.entities))
 
     @classmethod
     def load(cls, path: str) -> Dict[str, Any]:
-        with open(path, "r") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return from_json(f.read())
@@ -1,19 +1,29 @@
 import os
 import json
+import asyncio
 import re
-import hashlib
-import io
-from typing import List, Optional, Dict, Any
-import pandas as pd
+import tempfile
+from datetime import datetime
+from functools import cached_property, lru_cache
+from itertools import chain, islice
+from typing import List, Optional, Dict, Any, Tuple
 import instructor
-import chromadb
-from openai import OpenAI
+from openai import AsyncOpenAI
 from pydantic import BaseModel
-from venra.models import DocBlock, TableBlock, TextBlock, UFLRow, EntityMetadata, FactExtractionResponse, ScrapedFact
+from pydantic_core import from_json, to_json
+from venra.models import DocBlock, TableBlock, TextBlock, UFLRow, EntityMetadata, FactExtractionResponse, MultiBlockFactExtractionResponse, ScrapedFact
 from venra.config import settings
+from venra.hashing import content_id
+from venra.http import get_http_client, get_groq_limiter
+from venra.ingestion import _iter_lines
+from venra.vector_store import get_chroma_client, get_embedding_function
 from venra.prompt_loader import load_prompt
+from venra.llm_cache import get_llm_cache
 from venra.logging_config import logger
 
+# A CIK as printed on cover pages: up to 10 digits, often zero-padded
+_CIK_RE = re.compile(r"\b0{0,6}\d{7,10}\b")
+
 class EntityResolver:
     def __init__(self, api_key: Optional[str] = None, base_url: str = "https://api.groq.com/openai/v1"):
         self.api_key = api_key or settings.GROQ_API_KEY
@@ -21,74 +31,240 @@ class EntityResolver:
              logger.warning("GROQ_API_KEY not found. EntityResolver might fail against real API.")
         
         self.client = instructor.from_openai(
-            OpenAI(
+            AsyncOpenAI(
                 base_url=base_url,
-                api_key=self.api_key or "dummy_key"
+                api_key=self.api_key or "dummy_key",
+                http_client=get_http_client(),
+                max_retries=settings.GROQ_MAX_RETRIES
             ),
             mode=instructor.Mode.JSON
         )
         self.model = settings.SLM_MODEL_PRECISION
+        self._known: Dict[str, Dict[str, Any]] = self._load_known() if settings.KNOWN_ENTITIES_ENABLED else {}
+
+    @staticmethod
+    def _load_known() -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(settings.KNOWN_ENTITIES_PATH):
+            return {}
+        with open(settings.KNOWN_ENTITIES_PATH, "rb") as f:
+            return from_json(f.read())
+
+    @staticmethod
+    def _cover_keys(blocks: List[DocBlock]) -> List[str]:
+        """Registry keys a cover page can be recognized by: CIK-shaped tokens and the registrant name."""
+        keys = []
+        for block in blocks:
+            if any("name of registrant" in p.lower() for p in block.section_path):
+                keys.append("name:" + " ".join(block.content.split()).casefold())
+            keys.extend(f"cik:{int(cik)}" for cik in _CIK_RE.findall(block.content))
+        return list(dict.fromkeys(keys))
+
+    def _remember(self, cover_keys: List[str], meta: EntityMetadata):
+        # Only the registrant name and the CIK the model confirmed identify the issuer;
+        # other CIK-shaped numbers on the cover (file numbers, share counts) are not stored
+        keys = [k for k in cover_keys if k.startswith("name:")]
+        cik = (meta.cik or "").strip()
+        if cik.isdigit():
+            keys.append(f"cik:{int(cik)}")
+        if not keys:
+            return
+        self._known.update(dict.fromkeys(keys, meta.model_dump()))
+        # Written to a temp file beside the registry and swapped in, so a crash or a
+        # concurrent ingest never leaves a truncated registry behind
+        registry_dir = os.path.dirname(settings.KNOWN_ENTITIES_PATH) or "."
+        os.makedirs(registry_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=registry_dir, prefix=".known_entities.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(to_json(self._known, indent=2))
+            os.replace(tmp_path, settings.KNOWN_ENTITIES_PATH)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
     async def resolve_entity(self, blocks: List[DocBlock]) -> EntityMetadata:
         """
         Analyzes the first few blocks (Cover Page) to extract canonical entity info.
+        With KNOWN_ENTITIES_ENABLED, an issuer already resolved once (matched by CIK or
+        registrant name) is returned from the registry without an LLM call.
         """
+        cover_keys = self._cover_keys(blocks[:20]) if settings.KNOWN_ENTITIES_ENABLED else []
+        for k in cover_keys:
+            if k in self._known:
+                resp = EntityMetadata.model_validate(self._known[k])
+                logger.info("Resolved Entity from registry: %s (%s)", resp.canonical_id, resp.official_name)
+                return resp
+
         context_text = ""
         for block in blocks[:20]:
             context_text += f"[{block.block_type.value.upper()}] Path: {block.section_path}\nContent: {block.content}\n---\n"
             
         logger.info("Resolving Entity from Cover Page context...")
+        messages = [
+            {
+                "role": "system", 
+                "content": "You are a financial data extraction engine. You will be given the raw text of a 10-K cover page. Your job is to extract the exact legal name, CIK (if present), and create a Canonical ID (e.g. 'ID_AAPL') and list of common aliases (e.g. 'The Company')."
+            },
+            {
+                "role": "user", 
+                "content": f"Extract Entity Metadata from this cover page content:\n\n{context_text}"
+            }
+        ]
+
+        cache = get_llm_cache()
+        key = cache.key(self.model, messages) if cache else None
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            resp = EntityMetadata.model_validate_json(cached)
+        else:
+            resp = await self.client.chat.completions.create(
+                model=self.model,
+                response_model=EntityMetadata,
+                messages=messages,
+                temperature=0.0
+            )
+            if key:
+                cache.set(key, resp.model_dump_json())
+        if settings.KNOWN_ENTITIES_ENABLED:
+            self._remember(cover_keys, resp)
         
-        resp = self.client.chat.completions.create(
-            model=self.model,
-            response_model=EntityMetadata,
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are a financial data extraction engine. You will be given the raw text of a 10-K cover page. Your job is to extract the exact legal name, CIK (if present), and create a Canonical ID (e.g. 'ID_AAPL') and list of common aliases (e.g. 'The Company')."
-                },
-                {
-                    "role": "user", 
-                    "content": f"Extract Entity Metadata from this cover page content:\n\n{context_text}"
-                }
-            ],
-            temperature=0.0
-        )
-        
-        logger.info(f"Resolved Entity: {resp.canonical_id} ({resp.official_name})")
+        logger.info("Resolved Entity: %s (%s)", resp.canonical_id, resp.official_name)
         return resp
 
+_SEP_RE = re.compile(r"^\|?\s*:?-+:?\s*\|")
+_PERIOD_RE = re.compile(r"20\d{2}")
+# Leading pipe, indentation (&nbsp; or spaces), then the row label
+_INDENT_RE = re.compile(r"\|?\s*((?:&nbsp;|\s)*)([^|]+)")
+# Footnote markers: "(1)", "(a)" and a trailing letter glued to a number ("12a")
+_FOOTNOTE_RE = re.compile(r"\s*\([\d\w]+\)")
+_TRAILING_FOOTNOTE_RE = re.compile(r"([0-9])[a-z]$")
+# A bare number ("1,234.5", "-12"): no parens, footnotes or currency to strip
+_PLAIN_NUMBER_RE = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+# Strings pandas' CSV reader treats as missing; kept so cells read the same as before
+_NA_CELLS = frozenset({
+    "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+})
+# Em dash, en dash and minus sign all mean "nil" in a filing cell; fold them to "-"
+_DASH_TRANS = str.maketrans({"—": "-", "–": "-", "−": "-"})
+_MISSING_CELLS = frozenset({"", "n/a", "nan"})
+
+@lru_cache(maxsize=8192)
+def _parse_cell(val_str: str) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Parses one table cell into (value, nuance). Filings repeat the same cell text
+    ("—", "", totals restated across tables), so results are memoized, and plain
+    numbers like "1,234.5" skip the footnote/paren cleanup entirely.
+    """
+    s = val_str.strip().replace("&nbsp;", " ")
+    s = s.strip()
+    if _PLAIN_NUMBER_RE.fullmatch(s):
+        return float(s.replace(",", "")), None
+    if s.translate(_DASH_TRANS) == "-":
+        return 0.0, "Dash treated as zero"
+    
+    # Check for negative in parens BEFORE footnote stripping
+    is_neg_parens = False
+    if s.startswith("(") and s.endswith(")"):
+        is_neg_parens = True
+        s = s[1:-1]
+
+    s = _FOOTNOTE_RE.sub("", s)
+    s = _TRAILING_FOOTNOTE_RE.sub(r"\1", s)
+    s = s.replace(",", "").replace("$", "").strip()
+    
+    if s.lower() in _MISSING_CELLS:
+        return None, None
+    
+    if is_neg_parens:
+        s = "-" + s
+        nuance = "Negative (parentheses)"
+    else:
+        nuance = None
+        
+    try:
+        return float(s), nuance
+    except ValueError:
+        return None, None
+
+@lru_cache(maxsize=1024)
+def _scale_from_text(context: str) -> float:
+    """Scale implied by a table's section path + first line; tables in a section share it."""
+    context = context.lower()
+    if "millions" in context:
+        return 1_000_000.0
+    if "thousands" in context or "000s" in context:
+        return 1_000.0
+    return 1.0
+
+@lru_cache(maxsize=4096)
+def _is_period_col(col_name: str) -> bool:
+    return bool(_PERIOD_RE.search(col_name))
+
+# Header spellings that already name one period; anything else goes to the SLM
+_YEAR_HEADER_RE = re.compile(r"(?:19|20)\d{2}")
+_ISO_DATE_HEADER_RE = re.compile(r"(?:19|20)\d{2}-\d{2}-\d{2}")
+_DATE_HEADER_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%b. %d, %Y", "%m/%d/%Y")
+
+# Headers whose qualifier is part of the period's meaning; never collapsed into a bare date
+_QUALIFIED_HEADER_RE = re.compile(
+    r"restated|months|weeks|quarter|pro forma|adjusted|unaudited|as reported|predecessor|successor",
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=4096)
+def _local_period(header: str) -> Optional[str]:
+    """Deterministic normalization for simple headers ("2024", "December 31, 2024"), else None."""
+    h = " ".join(header.split())
+    if _YEAR_HEADER_RE.fullmatch(h) or _ISO_DATE_HEADER_RE.fullmatch(h):
+        return h
+    for fmt in _DATE_HEADER_FORMATS:
+        try:
+            return datetime.strptime(h, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+class HeaderMap(BaseModel):
+    mapping: Dict[str, str]
+
 class TableMelter:
+    # Unique headers per normalization prompt; larger prompts get slower and less reliable
+    HEADER_BATCH_SIZE = 50
+
     def __init__(self, entity_id: str, entity_name_raw: str = "Unknown Entity", api_key: Optional[str] = None):
         self.entity_id = entity_id
         self.entity_name_raw = entity_name_raw
         self.api_key = api_key or settings.GROQ_API_KEY
-        
-        # Initialize SLM for header normalization
-        self.client = instructor.from_openai(
-            OpenAI(
+
+    @cached_property
+    def client(self):
+        """SLM for header normalization; built on first use so melt-only workers skip it."""
+        return instructor.from_openai(
+            AsyncOpenAI(
                 base_url="https://api.groq.com/openai/v1",
-                api_key=self.api_key or "dummy_key"
+                api_key=self.api_key or "dummy_key",
+                http_client=get_http_client(),
+                max_retries=settings.GROQ_MAX_RETRIES
             ),
             mode=instructor.Mode.JSON
         )
 
-    def melt(self, block: TableBlock) -> List[UFLRow]:
-        content = block.content.strip()
-        lines = content.split("\n")
-        
-        if not lines:
-            return []
-
-        # 0. Header Merging Heuristic
-        # Tables often have multi-line headers like "| Fiscal Years | | |" followed by "| Ended | 2025 | 2024 |"
+    @staticmethod
+    def _merge_headers(head: List[str]) -> Tuple[List[str], int]:
+        """
+        Header Merging Heuristic: tables often have multi-line headers like "| Fiscal Years | | |"
+        followed by "| Ended | 2025 | 2024 |". Returns the merged header row and the index
+        of the first line after the separator.
+        """
         header_rows = []
         data_start_idx = 0
-        for i, line in enumerate(lines[:5]):
-            if re.match(r"^\|?\s*:?-+:?\s*\|", line.strip()):
+        for i, line in enumerate(head):
+            stripped = line.strip()
+            if _SEP_RE.match(stripped):
                 data_start_idx = i + 1
                 break
-            header_rows.append([p.strip() for p in line.strip().strip("|").split("|")])
+            header_rows.append([p.strip() for p in stripped.strip("|").split("|")])
         
         # Merge headers
         merged_headers = []
@@ -100,18 +276,39 @@ class TableMelter:
                     if col_idx < len(row) and row[col_idx]:
                         parts.append(row[col_idx])
                 merged_headers.append(" ".join(parts).strip())
+        return merged_headers, data_start_idx
+
+    def table_headers(self, block: TableBlock) -> List[str]:
+        """The merged value-column headers melt() will see (the row-label column excluded)."""
+        merged_headers, _ = self._merge_headers(list(islice(_iter_lines(block.content.strip()), 5)))
+        return merged_headers[1:]
+
+    def melt(self, block: TableBlock, header_map: Optional[Dict[str, str]] = None) -> List[UFLRow]:
+        """
+        Melts a markdown table into UFL rows. header_map (from normalize_headers_batch)
+        renames value-column headers, e.g. "Dec. 31, 2024" -> "2024-12-31", before periods are read.
+        """
+        # Lines are streamed; only the (at most 5) header candidates are held aside
+        lines = _iter_lines(block.content.strip())
+
+        # 0. Header Merging Heuristic
+        head = list(islice(lines, 5))
+        merged_headers, data_start_idx = self._merge_headers(head)
+        if header_map and merged_headers:
+            merged_headers = merged_headers[:1] + [header_map.get(h, h) for h in merged_headers[1:]]
         
         # 1. Hierarchical Disambiguation (Track parents by indentation)
-        hierarchy_lines = []
+        hierarchy_rows = []
         parent_stack = [] # List of names
         
         # Skip the original header rows we just merged
-        for line in lines[data_start_idx:]:
-            if not line.strip() or re.match(r"^\|?\s*:?-+:?\s*\|", line.strip()):
+        for line in chain(head[data_start_idx:], lines):
+            stripped = line.strip()
+            if not stripped or _SEP_RE.match(stripped):
                 continue
                 
             # Detect indentation: count leading &nbsp; or spaces after the first optional |
-            indent_match = re.match(r"\|?\s*((?:&nbsp;|\s)*)([^|]+)", line)
+            indent_match = _INDENT_RE.match(line)
             if indent_match:
                 indent_str = indent_match.group(1)
                 metric_text = indent_match.group(2).strip()
@@ -132,8 +329,7 @@ class TableMelter:
                 else:
                     full_name = metric_text
                 
-                inner_content = line.strip().strip("|")
-                parts = [p.strip() for p in inner_content.split("|")]
+                parts = [p.strip() for p in stripped.strip("|").split("|")]
                 
                 # Heuristic: If all subsequent columns are empty, it's a parent
                 is_parent = len(parts) > 1 and all(not p for p in parts[1:])
@@ -145,47 +341,47 @@ class TableMelter:
                 if len(parts) < len(merged_headers):
                     parts.extend([""] * (len(merged_headers) - len(parts)))
                 
-                new_line = "| " + " | ".join(parts) + " |"
-                hierarchy_lines.append(new_line)
+                hierarchy_rows.append(parts)
 
-        # 2. Cleanup and DataFrame Conversion
-        csv_header = "| " + " | ".join(merged_headers) + " |"
-        csv_content = csv_header + "\n" + "\n".join(hierarchy_lines)
-        
-        try:
-            df = pd.read_csv(io.StringIO(csv_content), sep=r"\s*\|\s*", engine="python")
-            # Filter out the "empty" columns from leading/trailing pipes
-            df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-            df.columns = [c.strip() for c in df.columns]
-        except Exception as e:
-            logger.error(f"Pandas parsing failed: {e}")
+        # 2. Cleanup: the cells are already split, so no CSV round-trip is needed
+        columns = self._column_names(merged_headers)
+        if not columns:
             return []
         
         table_scale_factor = self._detect_scale(block)
-        id_col = df.columns[0]
-        period_cols = [c for c in df.columns[1:] if self._is_period_col(c)]
+        period_cols = [(i, c) for i, c in columns[1:] if self._is_period_col(c)]
         if not period_cols:
-            period_cols = [df.columns[1]] if len(df.columns) > 1 else []
+            period_cols = [columns[1]] if len(columns) > 1 else []
 
-        ufl_rows = []
-        for _, row in df.iterrows():
-            metric_raw = str(row[id_col]).strip()
+        # Row pass: label cleanup and per-row unit/scale
+        kept = []
+        for parts in hierarchy_rows:
+            metric_raw = self._cell(parts, columns[0][0])
             if not metric_raw or metric_raw.lower() == "nan":
                 continue
             
-            metric_clean = re.sub(r"\s*\([\d\w]+\)", "", metric_raw).strip()
+            metric_clean = _FOOTNOTE_RE.sub("", metric_raw).strip()
+            metric_lower = metric_clean.lower()
             row_scale_factor = table_scale_factor
             unit = "USD"
-            if any(kw in metric_clean.lower() for kw in ["per share", "eps"]):
+            if any(kw in metric_lower for kw in ["per share", "eps"]):
                 row_scale_factor = 1.0
                 unit = "USD/Share"
-            elif any(kw in metric_clean.lower() for kw in ["ratio", "percentage", "margin"]):
+            elif any(kw in metric_lower for kw in ["ratio", "percentage", "margin"]):
                 row_scale_factor = 1.0
                 unit = "Ratio"
-                
-            for period in period_cols:
-                raw_val = str(row[period]).strip()
-                val, nuance = self._parse_numeric(raw_val)
+            kept.append((parts, metric_clean, row_scale_factor, unit))
+
+        # Column pass: parse each period column in one sweep (repeated cells hit the
+        # _parse_cell memo), plus everything that is constant per column or table
+        parsed_cols = [[_parse_cell(self._cell(row[0], col_idx)) for row in kept] for col_idx, _ in period_cols]
+        restated_cols = ["restated" in period.lower() for _, period in period_cols]
+        doc_section = " > ".join(block.section_path)
+
+        ufl_rows = []
+        for r, (parts, metric_clean, row_scale_factor, unit) in enumerate(kept):
+            for c, (_, period) in enumerate(period_cols):
+                val, nuance = parsed_cols[c][r]
                 scaled_val = val * row_scale_factor if val is not None else None
                 
                 if val is None:
@@ -193,13 +389,14 @@ class TableMelter:
                 else:
                     confidence = settings.CONFIDENCE_TABLE
                 
-                if "restated" in period.lower():
+                if restated_cols[c]:
                     nuance = (nuance + " (Restated)") if nuance else "Restated"
 
                 row_id_seed = f"{self.entity_id}_{metric_clean}_{period}_{block.id}_{scaled_val}"
-                row_id = hashlib.md5(row_id_seed.encode()).hexdigest()
+                row_id = content_id(row_id_seed)
                 
-                ufl_rows.append(UFLRow(
+                # Built without per-row validation; the first row is validated below
+                ufl_rows.append(UFLRow.model_construct(
                     row_id=row_id,
                     entity_id=self.entity_id,
                     entity_name_raw=self.entity_name_raw,
@@ -208,12 +405,15 @@ class TableMelter:
                     unit=unit,
                     scale_factor=row_scale_factor,
                     period=period,
-                    doc_section=" > ".join(block.section_path),
+                    doc_section=doc_section,
                     source_chunk_id=block.id,
                     nuance_note=nuance,
                     confidence=confidence
                 ))
-                
+
+        # Every row comes from the same code path, so one validation guards the types of all
+        if ufl_rows:
+            UFLRow.model_validate(ufl_rows[0].model_dump())
         return ufl_rows
 
     async def normalize_headers_with_slm(self, headers: List[str]) -> Dict[str, str]:
@@ -221,57 +421,125 @@ class TableMelter:
         Uses SLM to normalize messy column headers to ISO 8601 dates.
         """
         prompt = f"Convert these financial table column headers into ISO 8601 dates (YYYY-MM-DD) or standardized period names. Headers: {headers}"
-        
-        class HeaderMap(BaseModel):
-            mapping: Dict[str, str]
 
-        resp = self.client.chat.completions.create(
+        resp = await self.client.chat.completions.create(
             model=settings.SLM_MODEL_FAST,
             response_model=HeaderMap,
             messages=[{"role": "user", "content": prompt}]
         )
         return resp.mapping
 
+    async def normalize_headers_batch(self, tables: Dict[str, List[str]]) -> Dict[str, Dict[str, str]]:
+        """
+        Normalizes the headers of many tables (keyed by table id) with as few SLM calls
+        as possible: bare years and plain dates are resolved locally, the remaining unique
+        headers across the document are sent HEADER_BATCH_SIZE at a time, the chunks run
+        concurrently, and the mapping is fanned back per table.
+        Qualified headers ("(Restated)", "Three Months Ended ...") are left unmapped, and so
+        are headers of one table that would map to the same period: melt() would otherwise
+        tell them apart only by a ".1" suffix.
+        """
+        mapping: Dict[str, str] = {}
+        unique = []
+        for h in dict.fromkeys(h for headers in tables.values() for h in headers if h):
+            if _QUALIFIED_HEADER_RE.search(h):
+                continue
+            local = _local_period(h)
+            if local is None:
+                unique.append(h)
+            else:
+                mapping[h] = local
+        chunks = [unique[i:i + self.HEADER_BATCH_SIZE] for i in range(0, len(unique), self.HEADER_BATCH_SIZE)]
+        sem = asyncio.Semaphore(settings.GROQ_CONCURRENCY)
+        limiter = get_groq_limiter()
+
+        async def _normalize(chunk: List[str]) -> Dict[str, str]:
+            async with limiter, sem:
+                return await self.normalize_headers_with_slm(chunk)
+
+        results = await asyncio.gather(*[_normalize(c) for c in chunks], return_exceptions=True)
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                logger.error("Header normalization failed for %s headers: %s", len(chunk), result)
+                continue
+            mapping.update(result)
+        return {tid: self._unambiguous(headers, mapping) for tid, headers in tables.items()}
+
+    @staticmethod
+    def _unambiguous(headers: List[str], mapping: Dict[str, str]) -> Dict[str, str]:
+        """The table's share of mapping, minus headers that collide on the same normalized value."""
+        table_map = {h: mapping[h] for h in dict.fromkeys(headers) if h in mapping}
+        counts: Dict[str, int] = {}
+        for value in table_map.values():
+            counts[value] = counts.get(value, 0) + 1
+        return {h: v for h, v in table_map.items() if counts[v] == 1}
+
     def _detect_scale(self, block: TableBlock) -> float:
-        context = " ".join(block.section_path).lower() + " " + block.content.split("\n")[0].lower()
-        if "millions" in context:
-            return 1_000_000.0
-        if "thousands" in context or "000s" in context:
-            return 1_000.0
-        return 1.0
+        return _scale_from_text(" ".join(block.section_path) + " " + block.content.partition("\n")[0])
 
     def _is_period_col(self, col_name: str) -> bool:
-        return bool(re.search(r"20\d{2}", str(col_name)))
+        return _is_period_col(str(col_name))
 
-    def _parse_numeric(self, val_str: str):
-        s = val_str.strip().replace("&nbsp;", " ")
-        s = s.strip()
-        if s in ["—", "-", "–"]:
-            return 0.0, "Dash treated as zero"
-        
-        # Check for negative in parens BEFORE footnote stripping
-        is_neg_parens = False
-        if s.startswith("(") and s.endswith(")"):
-            is_neg_parens = True
-            s = s[1:-1]
-
-        s = re.sub(r"\s*\([\d\w]+\)", "", s)
-        s = re.sub(r"([0-9])[a-z]$", r"\1", s)
-        s = s.replace(",", "").replace("$", "").strip()
-        
-        if not s or s.lower() in ["n/a", "nan"]:
-            return None, None
-        
-        if is_neg_parens:
-            s = "-" + s
-            nuance = "Negative (parentheses)"
-        else:
-            nuance = None
-            
-        try:
-            return float(s), nuance
-        except ValueError:
-            return None, None
+    @staticmethod
+    def _column_names(headers: List[str]) -> List[Tuple[int, str]]:
+        """
+        Returns (cell index, name) for the columns kept from a merged header row.
+        Duplicate names get pandas-style ".1" suffixes; blank value headers are dropped
+        (they are layout artifacts), but the first column always holds the row labels.
+        """
+        counts: Dict[str, int] = {}
+        columns = []
+        for i, name in enumerate(headers):
+            if not name or name.startswith("Unnamed"):
+                if i == 0:
+                    columns.append((i, name))
+                continue
+            count = counts.get(name, 0)
+            while count:
+                counts[name] = count + 1
+                name = f"{name}.{count}"
+                count = counts.get(name, 0)
+            counts[name] = count + 1
+            columns.append((i, name))
+        return columns
+
+    @staticmethod
+    def _cell(parts: List[str], idx: int) -> str:
+        """Cell text at idx; cells past the end or spelled like a pandas NA are empty."""
+        if idx >= len(parts):
+            return ""
+        value = parts[idx]
+        return "" if value in _NA_CELLS else value
+
+    def _parse_numeric(self, val_str: str) -> Tuple[Optional[float], Optional[str]]:
+        return _parse_cell(val_str)
+
+def _melt_one(entity_id: str, entity_name_raw: str, block: TableBlock,
+              header_map: Optional[Dict[str, str]] = None) -> List[UFLRow]:
+    """Top-level (picklable) melt of a single table, for process-pool workers."""
+    return TableMelter(entity_id=entity_id, entity_name_raw=entity_name_raw).melt(block, header_map)
+
+# Sentences that state a figure: money, a scaled/percent amount, a change "by N",
+# a number with thousands separators, a decimal amount ("3.45"), a financial noun
+# stated as a bare number ("Net income was 412"), or a count of shares/units.
+# Text without any of these rarely yields a fact.
+_FACT_RE = re.compile(
+    r"\$\s*\d"
+    r"|\d[\d,.]*\s*(?:%|percent|million|billion|thousand|bps|basis points)"
+    r"|\b(?:increased|decreased|grew|declined|rose|fell|repurchased|issued|paid|recorded|reported)\b[^.]{0,40}?\d"
+    r"|\d{1,3}(?:,\d{3})+"
+    r"|\b\d+\.\d+\b"
+    r"|\b(?:revenues?|sales|income|earnings|eps|profit|loss|margin|expenses?|costs?|cash|debt|assets|liabilities|equity|dividends?|backlog)\b"
+    r"[^.\d]{0,30}?\b(?:was|were|is|of|totaled|totalled|at|to)\s+\(?-?\d"
+    r"|\b\d+\s+(?:shares|units|employees|stores|customers)\b",
+    re.IGNORECASE
+)
+
+# "{{name}}" slots in the extraction prompt template
+_PLACEHOLDER_RE = re.compile(r"\{\{(\w+)\}\}")
+
+# Schema appended to Batch API prompts (instructor does this itself for live calls)
+_FACT_EXTRACTION_SCHEMA_JSON = json.dumps(FactExtractionResponse.model_json_schema(), indent=2)
 
 class TextSynthesizer:
     def __init__(self, entity_id: str, entity_name_raw: str = "Unknown Entity", api_key: Optional[str] = None, base_url: str = "https://api.groq.com/openai/v1"):
@@ -279,40 +547,287 @@ class TextSynthesizer:
         self.entity_name_raw = entity_name_raw
         self.api_key = api_key or settings.GROQ_API_KEY
         
-        self.client = instructor.from_openai(
-            OpenAI(
-                base_url=base_url,
-                api_key=self.api_key or "dummy_key"
-            ),
-            mode=instructor.Mode.JSON
+        # Raw client kept for the Batch API (files/batches); instructor wraps it for live calls
+        self.openai_client = AsyncOpenAI(
+            base_url=base_url,
+            api_key=self.api_key or "dummy_key",
+            http_client=get_http_client(),
+            max_retries=settings.GROQ_MAX_RETRIES
         )
+        self.client = instructor.from_openai(self.openai_client, mode=instructor.Mode.JSON)
         self.model = settings.SLM_MODEL_FAST
         self.prompt_template = load_prompt("extract_financial_facts") or "You are a financial analyst. Extract facts from: {{text_content}}"
+        # Everything above the first placeholder's line is the same for every block. It is
+        # sent alone as the system message (instructor appends the schema after it), so the
+        # provider can serve that whole prefix from its prompt cache; the per-block fields
+        # follow in the user turn.
+        first = self.prompt_template.find("{{")
+        cut = self.prompt_template.rfind("\n", 0, first) + 1 if first != -1 else len(self.prompt_template)
+        self._static_prompt = self.prompt_template[:cut].rstrip()
+        # Literal text at even indices, placeholder names at odd ones
+        self._prompt_parts = _PLACEHOLDER_RE.split(self.prompt_template[cut:])
+
+    @staticmethod
+    def _looks_factual(content: str) -> bool:
+        """Cheap local check run before paying for an extraction call."""
+        return _FACT_RE.search(content) is not None
+
+    def _fill_prompt(self, values: Dict[str, str]) -> str:
+        # One join over the pre-split template instead of three full-prompt copies
+        parts = self._prompt_parts.copy()
+        for i in range(1, len(parts), 2):
+            parts[i] = values.get(parts[i], "{{" + parts[i] + "}}")
+        return "".join(parts)
+
+    def _messages(self, values: Dict[str, str], instruction: str) -> List[Dict[str, str]]:
+        filled = self._fill_prompt(values)
+        if not self._static_prompt:
+            # Placeholder on the first line: there is no static prefix to split off
+            return [{"role": "system", "content": filled}, {"role": "user", "content": instruction}]
+        return [
+            {"role": "system", "content": self._static_prompt},
+            {"role": "user", "content": f"{filled}\n\n{instruction}"}
+        ]
+
+    def _content_key(self, block: TextBlock, context_str: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.prompt_template},
+            {"context_str": context_str, "text_content": block.content}
+        ]
+
+    def _build_messages(self, block: TextBlock, context_str: str = "") -> List[Dict[str, str]]:
+        values = {"section_path": str(block.section_path), "context_str": context_str, "text_content": block.content}
+        return self._messages(values, "Extract facts.")
+
+    def _build_multi_messages(self, blocks: List[TextBlock], context_str: str = "") -> List[Dict[str, str]]:
+        text_content = "\n\n".join(
+            f"[BLOCK {i}] Section Path: {b.section_path}\n{b.content}" for i, b in enumerate(blocks)
+        )
+        values = {"section_path": "given per block", "context_str": context_str, "text_content": text_content}
+        return self._messages(values, (
+            f"Extract facts. The text content holds {len(blocks)} blocks, each starting with [BLOCK n]; "
+            "set source_block_index to that n on every fact."
+        ))
+
+    @staticmethod
+    def _pack_blocks(blocks: List[TextBlock], per_call: int, max_chars: int) -> List[List[TextBlock]]:
+        """Groups adjacent blocks, at most per_call per group and about max_chars of text."""
+        groups: List[List[TextBlock]] = []
+        current: List[TextBlock] = []
+        size = 0
+        for block in blocks:
+            n = len(block.content)
+            if current and (len(current) >= per_call or size + n > max_chars):
+                groups.append(current)
+                current, size = [], 0
+            current.append(block)
+            size += n
+        if current:
+            groups.append(current)
+        return groups
 
     async def extract_facts(self, block: TextBlock, context_str: str = "", model_name: Optional[str] = None) -> List[UFLRow]:
         if len(block.content.strip()) < 10:
             return []
             
         target_model = model_name or self.model
-        filled_prompt = self.prompt_template.replace("{{section_path}}", str(block.section_path))
-        filled_prompt = filled_prompt.replace("{{context_str}}", context_str)
-        filled_prompt = filled_prompt.replace("{{text_content}}", block.content)
+        messages = self._build_messages(block, context_str)
+
+        # Content-addressed: boilerplate repeats across filings and sections, so the key is the
+        # instructions + anchor context + block text, not the section path. Rows are rebuilt
+        # for this block, so section and chunk ids stay its own.
+        cache = get_llm_cache()
+        key = cache.key(target_model, self._content_key(block, context_str)) if cache else None
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            return self._facts_to_rows(block, FactExtractionResponse.model_validate_json(cached))
         
         try:
-            resp = self.client.chat.completions.create(
+            resp = await self.client.chat.completions.create(
                 model=target_model,
                 response_model=FactExtractionResponse,
-                messages=[
-                    {"role": "system", "content": filled_prompt},
-                    {"role": "user", "content": "Extract facts."}
-                ],
+                messages=messages,
                 temperature=0.0
             )
         except Exception as e:
-            logger.error(f"Failed to extract facts from block {block.id}: {e}")
+            logger.error("Failed to extract facts from block %s: %s", block.id, e)
             return []
-        
+
+        if key:
+            cache.set(key, resp.model_dump_json())
+        return self._facts_to_rows(block, resp)
+
+    async def _extract_facts_multi(self, blocks: List[TextBlock], context_str: str = "",
+                                   model_name: Optional[str] = None) -> List[List[UFLRow]]:
+        """
+        One extraction call for several blocks. Facts come back tagged with their
+        [BLOCK n] index and are split into one row list per block, in input order
+        (blocks too short to extract from get []).
+        """
+        kept = [i for i, b in enumerate(blocks) if len(b.content.strip()) >= 10]
+        out: List[List[UFLRow]] = [[] for _ in blocks]
+        if len(kept) <= 1:
+            for i in kept:
+                out[i] = await self.extract_facts(blocks[i], context_str, model_name)
+            return out
+
+        blocks = [blocks[i] for i in kept]
+        target_model = model_name or self.model
+        messages = self._build_multi_messages(blocks, context_str)
+
+        cache = get_llm_cache()
+        key = cache.key(target_model, messages) if cache else None
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            resp = MultiBlockFactExtractionResponse.model_validate_json(cached)
+        else:
+            try:
+                resp = await self.client.chat.completions.create(
+                    model=target_model,
+                    response_model=MultiBlockFactExtractionResponse,
+                    messages=messages,
+                    temperature=0.0
+                )
+            except Exception as e:
+                logger.error("Failed to extract facts from blocks %s: %s", [b.id for b in blocks], e)
+                return out
+            if key:
+                cache.set(key, resp.model_dump_json())
+
+        per_block: List[list] = [[] for _ in blocks]
+        for fact in resp.facts:
+            if 0 <= fact.source_block_index < len(blocks):
+                per_block[fact.source_block_index].append(fact)
+        for i, block, facts in zip(kept, blocks, per_block):
+            out[i] = self._facts_to_rows(block, FactExtractionResponse.model_construct(facts=facts))
+        return out
+
+    async def extract_facts_many(self, blocks: List[TextBlock], context_str: str = "",
+                                 concurrency: Optional[int] = None, model_name: Optional[str] = None,
+                                 blocks_per_call: Optional[int] = None) -> List[List[UFLRow]]:
+        """
+        Live extraction for many blocks: fans out concurrently, bounded by a semaphore
+        (GROQ_CONCURRENCY by default) and the process-wide Groq request rate
+        (get_groq_limiter). With blocks_per_call > 1 (TEXT_BLOCKS_PER_CALL by default),
+        adjacent blocks share one prompt. Returns one row list per block, in input
+        order; a failed block yields [].
+        """
+        sem = asyncio.Semaphore(concurrency or settings.GROQ_CONCURRENCY)
+        limiter = get_groq_limiter()
+        per_call = blocks_per_call or settings.TEXT_BLOCKS_PER_CALL
+
+        async def _extract(block: TextBlock) -> List[UFLRow]:
+            async with limiter, sem:
+                logger.info("Extracting facts from text in %s...", block.section_path[:2])
+                return await self.extract_facts(block, context_str=context_str, model_name=model_name)
+
+        async def _extract_group(group: List[TextBlock]) -> List[List[UFLRow]]:
+            async with limiter, sem:
+                logger.info("Extracting facts from %s text blocks in %s...", len(group), group[0].section_path[:2])
+                return await self._extract_facts_multi(group, context_str=context_str, model_name=model_name)
+
+        if per_call <= 1:
+            results = await asyncio.gather(*[_extract(b) for b in blocks], return_exceptions=True)
+        else:
+            groups = self._pack_blocks(blocks, per_call, settings.TEXT_PACK_MAX_CHARS)
+            grouped = await asyncio.gather(*[_extract_group(g) for g in groups], return_exceptions=True)
+            results = [
+                rows
+                for group, result in zip(groups, grouped)
+                for rows in (result if not isinstance(result, BaseException) else [result] * len(group))
+            ]
+
+        extracted = []
+        for block, result in zip(blocks, results):
+            if isinstance(result, BaseException):
+                logger.error("Fact extraction failed for block %s: %s", block.id, result)
+                result = []
+            extracted.append(result)
+        return extracted
+
+    # --- Batch API (offline ingestion) ---
+
+    def prepare_batch_request(self, block: TextBlock, context_str: str = "", model_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Builds one JSONL line for the Batch API. Mirrors instructor's JSON mode:
+        the response schema is appended to the system prompt and JSON output is forced.
+        """
+        messages = self._build_messages(block, context_str)
+        messages[0] = {
+            "role": "system",
+            "content": f"{messages[0]['content']}\n\nReturn JSON matching this schema:\n{_FACT_EXTRACTION_SCHEMA_JSON}"
+        }
+        return {
+            "custom_id": block.id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model_name or self.model,
+                "messages": messages,
+                "response_format": {"type": "json_object"},
+                "temperature": 0.0
+            }
+        }
+
+    def parse_batch_result(self, block: TextBlock, content: str) -> List[UFLRow]:
+        try:
+            resp = FactExtractionResponse.model_validate_json(content)
+        except Exception as e:
+            logger.error("Failed to parse batch result for block %s: %s", block.id, e)
+            return []
+        return self._facts_to_rows(block, resp)
+
+    async def extract_facts_batch(self, blocks: List[TextBlock], context_str: str = "",
+                                  model_name: Optional[str] = None, poll_interval: float = 30.0) -> Dict[str, List[UFLRow]]:
+        """
+        Submits all blocks as a single Batch API job, polls until it finishes and
+        returns UFL rows keyed by block id. Blocks missing from the output map to [].
+        Boilerplate repeated under one section shares a block id; the Batch API rejects
+        files with duplicate custom_ids, so each id is submitted once.
+        """
+        blocks = list({b.id: b for b in blocks if len(b.content.strip()) >= 10}.values())
+        if not blocks:
+            return {}
+
+        # JSONL built and read with pydantic-core's Rust (de)serializer, straight to/from bytes
+        jsonl = b"\n".join(to_json(self.prepare_batch_request(b, context_str, model_name)) for b in blocks)
+        batch_file = await self.openai_client.files.create(
+            file=("batch.jsonl", jsonl),
+            purpose="batch"
+        )
+        batch = await self.openai_client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info("Submitted fact extraction batch %s (%s blocks)", batch.id, len(blocks))
+
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(poll_interval)
+            batch = await self.openai_client.batches.retrieve(batch.id)
+
+        results: Dict[str, List[UFLRow]] = {b.id: [] for b in blocks}
+        if batch.status != "completed" or not batch.output_file_id:
+            logger.error("Fact extraction batch %s ended with status %s", batch.id, batch.status)
+            return results
+
+        output = await self.openai_client.files.content(batch.output_file_id)
+        by_id = {b.id: b for b in blocks}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = from_json(line)
+            block = by_id.get(record.get("custom_id"))
+            response = record.get("response") or {}
+            if block is None or response.get("status_code") != 200:
+                continue
+            content = response["body"]["choices"][0]["message"]["content"]
+            results[block.id] = self.parse_batch_result(block, content)
+        return results
+
+    def _facts_to_rows(self, block: TextBlock, resp: FactExtractionResponse) -> List[UFLRow]:
         ufl_rows = []
+        doc_section = " > ".join(block.section_path)
         for fact in resp.facts:
             if fact.confidence < settings.CONFIDENCE_TEXT_LOW:
                 continue
@@ -332,7 +847,7 @@ class TextSynthesizer:
 
             val_str = str(final_value) if final_value is not None else "None"
             row_id_seed = f"{self.entity_id}_{fact.metric_name}_{period}_{block.id}_{val_str}"
-            row_id = hashlib.md5(row_id_seed.encode()).hexdigest()
+            row_id = content_id(row_id_seed)
             
             ufl_rows.append(UFLRow(
                 row_id=row_id,
@@ -343,7 +858,7 @@ class TextSynthesizer:
                 unit=fact.unit,
                 scale_factor=1.0,
                 period=period,
-                doc_section=" > ".join(block.section_path),
+                doc_section=doc_section,
                 source_chunk_id=block.id,
                 nuance_note=final_nuance,
                 confidence=fact.confidence,
@@ -352,13 +867,29 @@ class TextSynthesizer:
             
         return ufl_rows
 
+_METRIC_WORD_RE = re.compile(r"[^\W_]+")
+
+def _metric_key(metric_name: str) -> str:
+    """Case-, spacing- and punctuation-insensitive form of a metric name."""
+    return " ".join(_METRIC_WORD_RE.findall(metric_name.casefold()))
+
+def _embed_unique(embedding_fn: Any, documents: List[str], seen: Dict[str, Any]) -> List[Any]:
+    """Embeds only documents not already in seen, then returns one vector per input in order."""
+    missing = [d for d in dict.fromkeys(documents) if d not in seen]
+    if missing:
+        seen.update(zip(missing, embedding_fn(missing)))
+    return [seen[d] for d in documents]
+
 class ContextIndexer:
     def __init__(self, db_path: str = settings.CHROMA_DB_PATH, embedding_fn: Optional[Any] = None):
-        self.client = chromadb.PersistentClient(path=db_path)
-        self.embedding_fn = embedding_fn
+        self.client = get_chroma_client(db_path)
+        shared_fn = get_embedding_function()
+        self.embedding_fn = embedding_fn or shared_fn
+        self._text_embedding_fn = shared_fn
         self.text_collection = self.client.get_or_create_collection(
             name="venra_text_chunks",
-            metadata={"hnsw:space": "cosine"}
+            metadata={"hnsw:space": "cosine"},
+            **({"embedding_function": shared_fn} if shared_fn else {})
         )
         self.schema_collection = self.client.get_or_create_collection(
             name="venra_metric_schema",
@@ -366,27 +897,94 @@ class ContextIndexer:
             embedding_function=self.embedding_fn
         )
 
-    def index_blocks(self, blocks: List[DocBlock]):
+    def index_blocks(self, blocks: List[DocBlock], batch_size: Optional[int] = None):
+        """
+        Upserts blocks in fixed-size batches so only one batch of embeddings is held at a time.
+        Repeated blocks (same id, section and text) are sent once; with a configured embedder, identical text
+        under different sections is embedded once per batch.
+        """
         if not blocks: return
-        documents = [b.content for b in blocks]
-        ids = [b.id for b in blocks]
-        metadatas = [{"block_type": b.block_type.value, "section_path": json.dumps(b.section_path), "page_num": b.page_num or 0} for b in blocks]
-        self.text_collection.upsert(documents=documents, ids=ids, metadatas=metadatas)
-        logger.info(f"Indexed {len(blocks)} blocks in ChromaDB.")
+        blocks = list({(b.id, tuple(b.section_path), b.content): b for b in blocks}.values())
+        batch_size = batch_size or settings.CHROMA_ADD_BATCH
+        for start in range(0, len(blocks), batch_size):
+            batch = blocks[start:start + batch_size]
+            documents = [b.content for b in batch]
+            ids = [b.id for b in batch]
+            metadatas = [{"block_type": b.block_type.value, "section_path": to_json(b.section_path).decode(), "page_num": b.page_num or 0} for b in batch]
+            if self._text_embedding_fn:
+                embeddings = _embed_unique(self._text_embedding_fn, documents, {})
+                self.text_collection.upsert(documents=documents, embeddings=embeddings, ids=ids, metadatas=metadatas)
+            else:
+                self.text_collection.upsert(documents=documents, ids=ids, metadatas=metadatas)
+        logger.info("Indexed %s blocks in ChromaDB.", len(blocks))
+
+    async def aindex_blocks(self, blocks: List[DocBlock], batch_size: Optional[int] = None):
+        """index_blocks on a worker thread, so embedding doesn't stall the event loop."""
+        await asyncio.to_thread(self.index_blocks, blocks, batch_size)
 
     def index_ufl_schema(self, rows: List[UFLRow]):
         if not rows: return
-        unique_metrics = {}
-        for r in rows:
-            key = f"{r.entity_id}_{r.metric_name}"
-            if key not in unique_metrics:
-                unique_metrics[key] = {"id": hashlib.md5(key.encode()).hexdigest(), "metric_name": r.metric_name, "entity_id": r.entity_id}
-        ids = [m['id'] for m in unique_metrics.values()]
-        documents = [m['metric_name'] for m in unique_metrics.values()]
-        metadatas = [{"entity_id": m['entity_id'], "metric_name": m['metric_name']} for m in unique_metrics.values()]
-        self.schema_collection.add(documents=documents, ids=ids, metadatas=metadatas)
-        logger.info(f"Indexed {len(unique_metrics)} unique metrics for schema mapping.")
+        # One entry per (entity, normalized metric name): spellings that differ only in
+        # case, spacing or punctuation ("Senior notes, payable") share the first-seen
+        # spelling's embedding, and the others are kept as its variants.
+        spellings: Dict[Tuple[str, str], Dict[str, None]] = {}
+        for pair in dict.fromkeys((r.entity_id, r.metric_name) for r in rows):
+            spellings.setdefault((pair[0], _metric_key(pair[1])), {})[pair[1]] = None
+        # The id comes from the normalized key, so reruns land on the same entry whichever
+        # spelling they see first; entries are upserted with the variants already stored.
+        metrics = [(content_id(f"{entity_id}_{key}"), entity_id, list(names))
+                   for (entity_id, key), names in spellings.items()]
+        # The same metric name recurs across entities; embed each distinct name once per call
+        vectors: Dict[str, Any] = {}
+        batch_size = settings.CHROMA_ADD_BATCH
+        for start in range(0, len(metrics), batch_size):
+            batch = metrics[start:start + batch_size]
+            ids = [mid for mid, _, _ in batch]
+            # Stores written before the normalized key used one entry per raw spelling,
+            # id content_id(f"{entity_id}_{spelling}"); those entries are folded in and removed
+            legacy = {mid: [lid for lid in dict.fromkeys(content_id(f"{entity_id}_{n}") for n in names) if lid != mid]
+                      for mid, entity_id, names in batch}
+            lookup = ids + [lid for lids in legacy.values() for lid in lids]
+            existing = self.schema_collection.get(ids=lookup, include=["metadatas"])
+            stored = dict(zip(existing["ids"], existing["metadatas"]))
+            documents = []
+            metadatas = []
+            stale = []
+            for mid, entity_id, names in batch:
+                # Keep the stored spelling as canonical; fold in stored and this run's variants
+                known = []
+                for sid in [mid, *legacy[mid]]:
+                    meta = stored.get(sid)
+                    if meta:
+                        known += [meta["metric_name"], *from_json(meta.get("variants") or "[]")]
+                        if sid != mid:
+                            stale.append(sid)
+                names = list(dict.fromkeys([*known, *names]))
+                meta = {"entity_id": entity_id, "metric_name": names[0]}
+                if len(names) > 1:
+                    meta["variants"] = to_json(names[1:]).decode()
+                documents.append(names[0])
+                metadatas.append(meta)
+            if self.embedding_fn:
+                embeddings = _embed_unique(self.embedding_fn, documents, vectors)
+                self.schema_collection.upsert(documents=documents, embeddings=embeddings, ids=ids, metadatas=metadatas)
+            else:
+                self.schema_collection.upsert(documents=documents, ids=ids, metadatas=metadatas)
+            if stale:
+                self.schema_collection.delete(ids=stale)
+                logger.info("Migrated %s legacy schema entries to normalized metric ids.", len(stale))
+        logger.info("Indexed %s unique metrics for schema mapping.", len(metrics))
 
     def update_chunk_linkage(self, chunk_id: str, row_ids: List[str]):
-        if not row_ids: return
-        self.text_collection.update(ids=[chunk_id], metadatas=[{"contains_rows": json.dumps(row_ids)}])
+        self.update_chunk_linkages({chunk_id: row_ids})
+
+    def update_chunk_linkages(self, links: Dict[str, List[str]], batch_size: Optional[int] = None):
+        """Back-populates chunk -> row ids for a whole document in batched updates."""
+        items = [(cid, row_ids) for cid, row_ids in links.items() if row_ids]
+        batch_size = batch_size or settings.CHROMA_ADD_BATCH
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            self.text_collection.update(
+                ids=[cid for cid, _ in batch],
+                metadatas=[{"contains_rows": to_json(row_ids).decode()} for _, row_ids in batch]
+            )
@@ -0,0 +1,52 @@
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import chromadb
+from venra.config import settings
+
+# One PersistentClient per store path, shared by every indexer/retriever in the
+# process so the SQLite catalogue and HNSW segments are opened once.
+_clients: Dict[str, "chromadb.ClientAPI"] = {}
+_lock = threading.Lock()
+
+def get_chroma_client(path: str) -> "chromadb.ClientAPI":
+    """Returns the shared client for a store path, creating it on first use."""
+    key = os.path.abspath(path)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = chromadb.PersistentClient(path=path)
+    return client
+
+def clear_chroma_clients():
+    """Forgets the shared clients (tests, or after a store was deleted on disk)."""
+    with _lock:
+        _clients.clear()
+
+@lru_cache(maxsize=None)
+def _sentence_transformer_fn(model_name: str, device: Optional[str], fp16: bool = False) -> Any:
+    from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+    if device is None:
+        try:
+            import torch
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        except ImportError:
+            device = "cpu"
+    kwargs = {}
+    # Half-precision weights only pay off (and are only well supported) on GPU
+    if fp16 and device.startswith("cuda"):
+        kwargs["model_kwargs"] = {"torch_dtype": "float16"}
+    return SentenceTransformerEmbeddingFunction(model_name=model_name, device=device, normalize_embeddings=True, **kwargs)
+
+def get_embedding_function() -> Optional[Any]:
+    """
+    Embedding function for the VeNRA collections, or None for Chroma's built-in default.
+    With EMBEDDING_MODEL set, documents are encoded by one shared sentence-transformers
+    model (GPU when available, FP16 there with EMBEDDING_FP16), a whole add/upsert
+    batch per forward pass; readers and writers must use the same function so
+    queries land in the same vector space.
+    """
+    if not settings.EMBEDDING_MODEL:
+        return None
+    return _sentence_transformer_fn(settings.EMBEDDING_MODEL, settings.EMBEDDING_DEVICE, settings.EMBEDDING_FP16)
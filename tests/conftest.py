@@ -1,5 +1,28 @@
 import os
 import sys
+import shutil
+import tempfile
 
 # Add src to python path so pytest can find the package
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+# Run the suite from a scratch directory, entered before venra is imported: the logs/
+# directory, the SQLite trace store (venra.db*) and other cwd-relative files land there
+# instead of the repository root, and every run starts from an empty store.
+_REPO_CWD = os.getcwd()
+_WORKDIR = tempfile.mkdtemp(prefix="venra-tests-")
+os.chdir(_WORKDIR)
+
+import pytest
+
+def pytest_unconfigure(config):
+    os.chdir(_REPO_CWD)
+    shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+@pytest.fixture(autouse=True)
+def _fresh_chroma_clients():
+    """Tests patch chromadb.PersistentClient; never hand one test another's shared client."""
+    from venra.vector_store import clear_chroma_clients
+    clear_chroma_clients()
+    yield
+    clear_chroma_clients()
@@ -0,0 +1,84 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, patch
+from venra.agent import ReasoningAgent, AgentReasoning, FinalResponse
+
+@pytest.fixture
+def mock_final():
+    return FinalResponse(
+        answer="Revenue was $100 (Source: row1)",
+        data_source_type="GROUNDED",
+        citations=["row1"],
+        groundedness_score=0.95,
+        is_self_aware_warning=False
+    )
+
+@pytest.mark.asyncio
+async def test_agent_response_cache(mock_final):
+    """
+    Test that a repeated (query, context) pair is served from the cache without any LLM call.
+    """
+    agent = ReasoningAgent(api_key="fake")
+    reasoning = AgentReasoning(plan="Read row1.", requires_math=False)
+
+    with patch.object(agent, "_call_kimi_reasoning", AsyncMock(return_value=reasoning)) as mock_kimi, \
+         patch.object(agent, "_prewarm_fast_client", AsyncMock()), \
+         patch.object(agent.fast_client.chat.completions, "create", AsyncMock(return_value=mock_final)) as mock_create:
+
+        first = await agent.answer("What was revenue?", "CTX")
+        second = await agent.answer("What was revenue?", "CTX")
+
+        assert mock_kimi.await_count == 1
+        assert mock_create.await_count == 1
+        assert second["final_response"] == first["final_response"]
+        assert agent.cache_stats()["hits"] == 1
+        assert agent.cache_stats()["misses"] == 1
+
+        # A different context is a different cache entry
+        await agent.answer("What was revenue?", "OTHER CTX")
+        assert mock_kimi.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_agent_cancels_prewarm_when_pass_1_fails():
+    """
+    Test that a Pass 1 failure cancels the in-flight Groq prewarm instead of leaving it pending.
+    """
+    agent = ReasoningAgent(api_key="fake")
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def slow_prewarm():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing_kimi(*args, **kwargs):
+        await started.wait()
+        raise RuntimeError("Kimi unavailable")
+
+    with patch.object(agent, "_call_kimi_reasoning", failing_kimi), \
+         patch.object(agent, "_prewarm_fast_client", slow_prewarm):
+        with pytest.raises(RuntimeError):
+            await agent.answer("What was revenue?", "CTX")
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+def test_strip_code_fence():
+    from venra.agent import _strip_code_fence
+
+    assert _strip_code_fence('{"plan": "x"}') == '{"plan": "x"}'
+    assert _strip_code_fence('Sure:\n```json\n{"plan": "x"}\n```\nDone.') == '{"plan": "x"}'
+    assert _strip_code_fence('```\n{"plan": "y"}\n```') == '{"plan": "y"}'
+    assert _strip_code_fence('``` draft ```\n```json {"plan": "z"}```') == '{"plan": "z"}'
+
+def test_final_response_model_is_prebuilt():
+    from instructor.function_calls import OpenAISchema
+
+    agent = ReasoningAgent(api_key="fake")
+    model = agent._final_response_model
+    assert issubclass(model, OpenAISchema)
+    assert issubclass(model, FinalResponse)
+    assert agent._final_response_model is model
@@ -37,3 +37,32 @@ def test_assembler_empty():
     context = assembler.assemble({})
     assert "No structured facts found." in context
     assert "No source text available." in context
+
+def test_assembler_ufl_table_format():
+    assembler = ContextAssembler()
+    row = UFLRow(
+        row_id="row1", entity_id="ID_T", entity_name_raw="Test",
+        metric_name="Net Sales", value=1_234_567_890.0, unit="USD", period="2023",
+        doc_section="S1", source_chunk_id="chunk1", nuance_note="a | b",
+        confidence=1.0
+    )
+
+    table = assembler._format_ufl_table([row])
+    lines = table.split("\n")
+
+    assert lines[0] == "| row_id | metric_name | value | unit | period | nuance_note | source_chunk_id |"
+    assert lines[1].startswith("|---|")
+    # Full precision, no scientific notation; pipes in text are escaped
+    assert "| 1234567890 |" in lines[2]
+    assert "a \\| b" in lines[2]
+
+def test_keyword_scorer_automaton_matches_simple_path():
+    keywords = ["net sales", "sales", "Revenue", "sales", "margin"]
+    keywords_lower = [k.lower() for k in keywords]
+    texts = ["total net sales rose", "revenue and gross margin", "nothing relevant", "sales sales sales"]
+
+    simple = ContextAssembler._keyword_scorer(keywords_lower, num_chunks=1)
+    fast = ContextAssembler._keyword_scorer(keywords_lower, num_chunks=100)
+
+    assert [fast(t) for t in texts] == [simple(t) for t in texts]
+    assert simple("total net sales rose") == 3 # "net sales" + "sales" counted twice
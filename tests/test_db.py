@@ -18,3 +18,24 @@ def test_db_initialization():
         assert "trace" in tables
         assert "chatsession" in tables
         conn.close()
+
+def test_sqlite_wal_and_batched_traces(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, event
+    from sqlmodel import Session, select
+    from venra import db
+    from venra.db import init_db, save_traces, Trace
+
+    # A private database, configured like the module engine, so reruns start empty
+    engine = create_engine(f"sqlite:///{tmp_path / 'venra.db'}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", db._set_sqlite_pragmas)
+    monkeypatch.setattr(db, "engine", engine)
+
+    init_db()
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+    save_traces([Trace(session_id="batch", query=f"q{i}") for i in range(3)])
+    with Session(engine) as session:
+        rows = session.exec(select(Trace).where(Trace.session_id == "batch")).all()
+    assert len(rows) == 3
+    engine.dispose()
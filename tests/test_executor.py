@@ -0,0 +1,37 @@
+import pytest
+from venra.executor import PythonExecutor
+
+@pytest.mark.asyncio
+async def test_executor_captures_output_and_reuses_bytecode():
+    executor = PythonExecutor()
+    code = "x = 40 + 2\nprint(x)"
+
+    first = await executor.execute(code)
+    second = await executor.execute(code)
+
+    assert first["output"] == "42"
+    assert first["variables"] == {"x": 42}
+    assert first["error"] is None
+    assert second["output"] == "42"
+    assert len(executor._code_cache) == 1
+
+@pytest.mark.asyncio
+async def test_executor_reports_errors_and_timeouts():
+    executor = PythonExecutor()
+
+    broken = await executor.execute("print(")
+    assert "SyntaxError" in broken["error"]
+
+    slow = await executor.execute("import time\ntime.sleep(1)", timeout=0.05)
+    assert "TimeoutError" in slow["error"]
+
+@pytest.mark.asyncio
+async def test_executor_kills_runaway_code_and_captures_stdout():
+    executor = PythonExecutor()
+
+    runaway = await executor.execute("while True:\n    pass", timeout=0.5)
+    assert "TimeoutError" in runaway["error"]
+
+    written = await executor.execute("import sys\nsys.stdout.write('a')\nprint('b', file=sys.stdout)")
+    assert written["output"] == "ab"
+    assert written["variables"] == {}
@@ -1,5 +1,5 @@
 from fastapi.testclient import TestClient
-from venra.main import app
+from venra.main import app, get_agent
 
 client = TestClient(app)
 
@@ -12,3 +12,25 @@ def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
+
+def test_query_fans_out_questions():
+    from unittest.mock import AsyncMock, patch
+
+    async def fake_answer(query, context, session_id=None):
+        return {"final_response": f"answer to {query}", "reasoning": None, "code_result": None}
+
+    with TestClient(app) as tc:
+        with patch.object(get_agent(), "answer", AsyncMock(side_effect=fake_answer)) as mock_answer:
+            response = tc.post("/query", json={"questions": ["Q1", "Q2"], "context": "CTX"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["question"] for r in body] == ["Q1", "Q2"]
+    assert body[1]["final_response"] == "answer to Q2"
+    assert mock_answer.await_count == 2
+
+def test_cache_stats():
+    with TestClient(app) as tc:
+        response = tc.get("/cache-stats")
+    assert response.status_code == 200
+    assert response.json() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 512}
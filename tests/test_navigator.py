@@ -1,7 +1,7 @@
 import pytest
 import os
 import json
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from venra.navigator import Navigator
 from venra.models import RetrievalPlan
 
@@ -39,7 +39,7 @@ async def test_navigator_generates_plan(mock_schema_file):
     with patch("venra.navigator.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
         mock_init.return_value = mock_client
-        mock_client.chat.completions.create.return_value = mock_plan
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_plan)
         
         nav = Navigator(api_key="fake", schema_path=mock_schema_file)
         plan = await nav.navigate("What were TransDigm's sales in 2023?")
@@ -62,7 +62,7 @@ async def test_navigator_fallback_on_error(mock_schema_file):
     with patch("venra.navigator.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
         mock_init.return_value = mock_client
-        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        mock_client.chat.completions.create = AsyncMock(side_effect=Exception("API Error"))
         
         nav = Navigator(api_key="fake", schema_path=mock_schema_file)
         plan = await nav.navigate("Some query")
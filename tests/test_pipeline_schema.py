@@ -1,11 +1,12 @@
 import os
 import pytest
 import json
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from venra.pipeline import IngestionPipeline
 from venra.schema import SchemaGenerator
 from venra.models import DocBlock, BlockType, EntityMetadata, UFLRow, FactExtractionResponse
 
+
 @pytest.fixture
 def mock_blocks():
     return [
@@ -15,6 +16,7 @@ def mock_blocks():
 | Net Sales | 100 |""", section_path=["Financials"]),
     ]
 
+
 @pytest.mark.asyncio
 async def test_pipeline_generates_schema_mocked(tmp_path, mock_blocks):
     """
@@ -36,6 +38,8 @@ async def test_pipeline_generates_schema_mocked(tmp_path, mock_blocks):
          patch("venra.synthesis.ContextIndexer.index_ufl_schema") as mock_index_schema:
         
         mock_client = MagicMock()
+        
+        mock_client.chat.completions.create = AsyncMock()
         mock_instructor_init.return_value = mock_client
         
         # Configure the mock client to return entity metadata then empty facts
@@ -71,6 +75,7 @@ async def test_pipeline_generates_schema_mocked(tmp_path, mock_blocks):
         metrics = schema["metrics"]
         assert "Net Sales" in metrics
 
+
 def test_schema_generator_logic():
     """
     Pure unit test for SchemaGenerator without any mocks.
@@ -101,4 +106,71 @@ def test_schema_generator_logic():
     assert "Revenue" in top_metrics
     assert "EBITDA" in top_metrics
     assert gen.metrics["Revenue"] == 2
-    assert gen.metrics["EBITDA"] == 1
\ No newline at end of file
+    assert gen.metrics["EBITDA"] == 1
+
+
+def test_looks_financial_matches_isdigit_count():
+    from venra.pipeline import _looks_financial
+
+    samples = ["Revenue grew $5", "In 2023 we hired 12", "FY 2023", "No numbers here", "Note¹²³ 45", "Note¹²³ 4"]
+    for text in samples:
+        expected = "$" in text or sum(c.isdigit() for c in text) > 4
+        assert _looks_financial(text) == expected, text
+
+
+def test_melt_tables_pool_matches_inline():
+    from venra.config import settings
+    from venra.synthesis import TableMelter
+
+    melter = TableMelter(entity_id="ID_TEST", entity_name_raw="Test Corp")
+    tables = [
+        DocBlock(block_type=BlockType.TABLE, section_path=["Notes", f"(In millions) {i}"],
+                 content=f"| Item | 2023 | 2022 |\n|---|---|---|\n| Sales {i} | {i} | {i + 1} |")
+        for i in range(6)
+    ]
+    inline = [melter.melt(b) for b in tables]
+    with patch.object(settings, "MELT_WORKERS", 2), patch.object(settings, "MELT_POOL_MIN_TABLES", 1):
+        pooled = IngestionPipeline._melt_tables(melter, tables)
+    assert pooled == inline
+
+
+@pytest.mark.asyncio
+async def test_normalize_and_melt_maps_headers_once_per_document():
+    from venra.config import settings
+    from venra.synthesis import TableMelter
+
+    tables = [
+        DocBlock(block_type=BlockType.TABLE, section_path=["Notes"],
+                 content=f"| Item | Dec. 31, 2024 | Fiscal 2023 |\n|---|---|---|\n| Sales {i} | {i} | {i + 1} |")
+        for i in range(3)
+    ]
+    with patch("venra.synthesis.instructor.from_openai") as mock_init, \
+         patch.object(settings, "TABLE_HEADER_NORMALIZATION", True):
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=MagicMock(mapping={"Fiscal 2023": "2023"}))
+        mock_init.return_value = mock_client
+        melter = TableMelter(entity_id="ID_TEST", entity_name_raw="Test Corp")
+
+        rows = await IngestionPipeline._normalize_and_melt(melter, tables)
+        with patch.object(settings, "TABLE_HEADER_NORMALIZATION", False):
+            raw = await IngestionPipeline._normalize_and_melt(melter, tables)
+
+    # One SLM call for the whole document; "Dec. 31, 2024" is resolved locally
+    assert mock_client.chat.completions.create.call_count == 1
+    assert [r.period for r in rows[0]] == ["2024-12-31", "2023"]
+    assert [r.metric_name for r in rows[2]] == ["Sales 2", "Sales 2"]
+    # Off (the default): headers are melted as written
+    assert [r.period for r in raw[0]] == ["Dec. 31, 2024", "Fiscal 2023"]
+
+
+def test_schema_generator_save_roundtrip(tmp_path):
+    gen = SchemaGenerator(output_path=str(tmp_path / "schema_summary.json"))
+    gen.add_entity(EntityMetadata(canonical_id="ID_TEST", official_name="Tést Corp", aliases=["TC"]))
+    row = UFLRow(row_id="1", entity_id="ID_TEST", metric_name="EBITDA", value=1.0, period="2023",
+                 source_chunk_id="c1", entity_name_raw="Test", doc_section="Financials", confidence=1.0)
+    gen.add_rows([row, row.model_copy(update={"metric_name": "Revenue"}), row.model_copy(update={"metric_name": "Revenue"})])
+    gen.save()
+
+    loaded = SchemaGenerator.load(gen.output_path)
+    assert loaded["metrics"] == ["Revenue", "EBITDA"]
+    assert loaded["entities"][0]["official_name"] == "Tést Corp"
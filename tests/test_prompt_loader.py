@@ -0,0 +1,35 @@
+from unittest.mock import patch
+from venra.config import settings
+from venra.prompt_loader import load_prompt, clear_prompt_cache
+
+def test_load_prompt_is_cached_per_file_version(tmp_path):
+    prompts = tmp_path / "PROMPTS.md"
+    prompts.write_text("## Text Extraction\n**ID:** `demo_prompt`\nFirst version\n## Next\n")
+
+    with patch.object(settings, "PROMPTS_PATH", str(prompts)):
+        clear_prompt_cache()
+        try:
+            first = load_prompt("demo_prompt")
+            assert first == "First version"
+            assert load_prompt("demo_prompt") is first
+
+            # An edited file is a new version: picked up without clearing the cache
+            prompts.write_text("## Text Extraction\n**ID:** `demo_prompt`\nSecond version\n")
+            assert load_prompt("demo_prompt") == "Second version"
+        finally:
+            clear_prompt_cache()
+
+def test_load_prompt_does_not_cache_failures(tmp_path):
+    prompts = tmp_path / "PROMPTS.md"
+    other = tmp_path / "OTHER.md"
+    other.write_text("**ID:** `demo_prompt`\nFrom the other file\n")
+
+    with patch.object(settings, "PROMPTS_PATH", str(prompts)):
+        assert load_prompt("demo_prompt") == ""
+        prompts.write_text("**ID:** `demo_prompt`\nNow present\n")
+        assert load_prompt("demo_prompt") == "Now present"
+
+    # The path is part of the key
+    with patch.object(settings, "PROMPTS_PATH", str(other)):
+        assert load_prompt("demo_prompt") == "From the other file"
+    clear_prompt_cache()
@@ -41,7 +41,7 @@ async def test_retriever_direct_and_expansion(mock_ufl_df):
     )
 
     # Mock ChromaDB and OS path check
-    with patch("venra.retriever.chromadb.PersistentClient") as mock_chroma, \
+    with patch("venra.vector_store.chromadb.PersistentClient") as mock_chroma, \
          patch("os.path.exists") as mock_exists, \
          patch("pandas.read_parquet") as mock_read_parquet:
         
@@ -105,7 +105,7 @@ async def test_retriever_fuzzy_metric_fallback(mock_ufl_df):
         reasoning="Test"
     )
 
-    with patch("venra.retriever.chromadb.PersistentClient"), \
+    with patch("venra.vector_store.chromadb.PersistentClient"), \
          patch("os.path.exists") as mock_exists, \
          patch("pandas.read_parquet") as mock_read_parquet:
         
@@ -116,3 +116,132 @@ async def test_retriever_fuzzy_metric_fallback(mock_ufl_df):
         results = await retriever.retrieve(plan)
         assert len(results["ufl_rows"]) == 1
         assert results["ufl_rows"][0].metric_name == "Net Sales"
+
+def test_retriever_categorical_filters(mock_ufl_df):
+    """
+    Test that filter columns are stored as categoricals and still filter like plain strings.
+    """
+    with patch("venra.vector_store.chromadb.PersistentClient"), \
+         patch("os.path.exists") as mock_exists, \
+         patch("pandas.read_parquet") as mock_read_parquet:
+
+        mock_exists.return_value = True
+        mock_read_parquet.return_value = mock_ufl_df
+        retriever = DualRetriever(ufl_path="fake.parquet")
+
+        assert isinstance(retriever.df["metric_name"].dtype, pd.CategoricalDtype)
+        rows = retriever._query_ufl(UFLFilter(entity_ids=["ID_TDG"], metric_keywords=["acqui"], years=["2023"]))
+        assert [r.row_id for r in rows] == ["r2"]
+        assert rows[0].related_entity_id == "Boeing"
+
+def test_retriever_shares_loaded_ufl(tmp_path, mock_ufl_df):
+    """
+    Test that a UFL parquet is read lazily, once per (path, mtime, size) across retriever instances.
+    """
+    ufl_path = tmp_path / "ufl.parquet"
+    mock_ufl_df.to_parquet(ufl_path, index=False)
+
+    with patch("venra.vector_store.chromadb.PersistentClient"), \
+         patch("venra.retriever.pd.read_parquet", wraps=pd.read_parquet) as spy:
+        first = DualRetriever(ufl_path=str(ufl_path))
+        second = DualRetriever(ufl_path=str(ufl_path))
+        # Nothing is read until the ledger is first used
+        assert spy.call_count == 0
+        assert first.df is second.df
+
+    assert spy.call_count == 1
+    # Only UFLRow fields present in the file are read
+    assert spy.call_args[1]["columns"] == [c for c in UFLRow.model_fields if c in mock_ufl_df.columns]
+
+@pytest.mark.asyncio
+async def test_retriever_batches_vector_queries(mock_ufl_df):
+    """
+    Test that hypothesis, keyword and related-entity searches go to Chroma as one query.
+    """
+    plan = RetrievalPlan(
+        strategy="HYBRID",
+        ufl_query=UFLFilter(entity_ids=["ID_TDG"], metric_keywords=["Acquisition"], years=["2023"]),
+        vector_hypothesis="TransDigm acquired...",
+        vector_keywords=["acquisition"],
+        reasoning="Test"
+    )
+    meta = {"block_type": "text", "section_path": json.dumps(["Notes"]), "page_num": 1}
+
+    with patch("venra.vector_store.chromadb.PersistentClient") as mock_chroma, \
+         patch("os.path.exists") as mock_exists, \
+         patch("pandas.read_parquet") as mock_read_parquet:
+
+        mock_exists.return_value = True
+        mock_read_parquet.return_value = mock_ufl_df
+        mock_collection = MagicMock()
+        mock_chroma.return_value.get_or_create_collection.return_value = mock_collection
+        mock_collection.query.return_value = {
+            "ids": [["c3", "c4"], ["c4", "c5"], ["c6", "c7", "c8"]],
+            "documents": [["t3", "t4"], ["t4", "t5"], ["t6", "t7", "t8"]],
+            "metadatas": [[meta] * 2, [meta] * 2, [meta] * 3]
+        }
+        mock_collection.get.return_value = {"ids": [], "documents": [], "metadatas": []}
+
+        retriever = DualRetriever(ufl_path="fake.parquet")
+        results = await retriever.retrieve(plan, k=2)
+
+    mock_collection.query.assert_called_once()
+    call = mock_collection.query.call_args[1]
+    assert call["query_texts"] == ["TransDigm acquired...", "acquisition", "Information about Boeing"]
+    assert call["n_results"] == 5
+    # The related-entity query is trimmed to its own k=2
+    assert [c.id for c in results["text_chunks"]] == ["c3", "c4", "c5", "c6", "c7"]
+
+def test_contains_any_literal_case_insensitive():
+    """
+    Test that the metric-keyword fallback matches literal substrings, ignoring case.
+    """
+    col = pd.Series(["Net Sales", "Sales (Net)", None, "EBITDA"], dtype="category")
+    assert DualRetriever._contains_any(col, ["sales (n"]).tolist() == [False, True, False, False]
+    assert DualRetriever._contains_any(col, ["ebit", "NET"]).tolist() == [True, True, False, True]
+    assert DualRetriever._contains_any(pd.Series([], dtype="category"), ["x"]).tolist() == []
+
+@pytest.mark.asyncio
+async def test_retriever_expansion_c_uses_chunk_index(mock_ufl_df):
+    """
+    Test that Chunk -> UFL expansion returns every row of the retrieved chunks, in ledger order.
+    """
+    extra = mock_ufl_df.iloc[[0]].assign(row_id="r3", source_chunk_id="c2")
+    ufl_df = pd.concat([mock_ufl_df, extra], ignore_index=True)
+    plan = RetrievalPlan(
+        strategy="VECTOR_ONLY",
+        vector_hypothesis="Acquisitions",
+        vector_keywords=[],
+        reasoning="Test"
+    )
+    meta = {"block_type": "text", "section_path": json.dumps(["Notes"]), "page_num": 1}
+
+    with patch("venra.vector_store.chromadb.PersistentClient") as mock_chroma, \
+         patch("os.path.exists") as mock_exists, \
+         patch("pandas.read_parquet") as mock_read_parquet:
+
+        mock_exists.return_value = True
+        mock_read_parquet.return_value = ufl_df
+        mock_collection = MagicMock()
+        mock_chroma.return_value.get_or_create_collection.return_value = mock_collection
+        mock_collection.query.return_value = {"ids": [["c2"]], "documents": [["t2"]], "metadatas": [[meta]]}
+
+        retriever = DualRetriever(ufl_path="fake.parquet")
+        results = await retriever.retrieve(plan, k=1)
+
+    assert [r.row_id for r in results["ufl_rows"]] == ["r2", "r3"]
+
+def test_query_ufl_empty_filter_selects_nothing(mock_ufl_df):
+    """
+    Test that a filter with no clues returns no rows instead of the whole ledger.
+    """
+    with patch("venra.vector_store.chromadb.PersistentClient"), \
+         patch("os.path.exists") as mock_exists, \
+         patch("pandas.read_parquet") as mock_read_parquet:
+
+        mock_exists.return_value = True
+        mock_read_parquet.return_value = mock_ufl_df
+        retriever = DualRetriever(ufl_path="fake.parquet")
+
+        assert retriever._query_ufl(UFLFilter(entity_ids=[], metric_keywords=[], years=[])) == []
+        assert [r.row_id for r in retriever._query_ufl(UFLFilter(entity_ids=[], metric_keywords=[], years=["2023"]))] == ["r1", "r2"]
@@ -170,3 +170,80 @@ End text.
         assert blocks[2].block_type == BlockType.TEXT
         assert blocks[3].block_type == BlockType.TABLE
         assert blocks[4].block_type == BlockType.TEXT
+
+def test_dom_round_trip(tmp_path):
+    """Test that save_dom/load_dom preserve block subclasses, ids and hierarchy."""
+    from venra.models import TextBlock, TableBlock
+    blocks = [
+        TextBlock(id="t1", content="Intro text.", section_path=["Item 7"], page_num=3),
+        TableBlock(id="t2", content="| A | B |\n|---|---|\n| 1 | 2 |", section_path=["Item 7", "Results"]),
+    ]
+    parser = StructuralParser(api_key="fake_key")
+    path = str(tmp_path / "processed" / "doc_dom.json")
+    parser.save_dom(blocks, path)
+
+    loaded = StructuralParser.load_dom(path)
+
+    assert [type(b) for b in loaded] == [TextBlock, TableBlock]
+    assert loaded == blocks
+
+def test_pickled_dom_migrates_to_json(tmp_path):
+    """Test that a DOM cached in the old pickle format is loaded once and rewritten as JSON."""
+    import pickle
+    from venra.models import TextBlock, TableBlock
+    blocks = [
+        TextBlock(id="t1", content="Intro text.", section_path=["Item 7"]),
+        TableBlock(id="t2", content="| A | B |\n|---|---|\n| 1 | 2 |", section_path=["Item 7"]),
+    ]
+    legacy = tmp_path / "doc_dom.pkl"
+    legacy.write_bytes(pickle.dumps(blocks))
+    path = str(tmp_path / "doc_dom.json")
+
+    migrated = StructuralParser(api_key="fake_key").migrate_pickled_dom(str(legacy), path)
+
+    assert migrated == blocks
+    assert StructuralParser.load_dom(path) == blocks
+
+@pytest.mark.asyncio
+async def test_iter_blocks_streams_across_documents():
+    """
+    Test that iter_blocks yields the same blocks as parse_pdf and carries the header stack across documents.
+    """
+    first, second = MagicMock(), MagicMock()
+    first.text = "# Part I\nIntro text.\n| A | B |\n|---|---|\n| 1 | 2 |"
+    second.text = "Continued text on the next page."
+    parser = StructuralParser(api_key="fake_key")
+
+    with patch("venra.ingestion.LlamaParse.aload_data", return_value=[first, second]):
+        streamed = [b async for b in parser.iter_blocks("dummy.pdf")]
+        listed = await parser.parse_pdf("dummy.pdf")
+
+    assert [b.block_type for b in streamed] == [BlockType.TEXT, BlockType.TABLE, BlockType.TEXT]
+    assert streamed[2].section_path == ["Part I"]
+    assert [b.id for b in streamed] == [b.id for b in listed]
+
+@pytest.mark.asyncio
+async def test_parse_cache_by_content_hash(tmp_path, monkeypatch):
+    """
+    Test that identical PDF bytes are parsed once, then served from memory or the disk tier.
+    """
+    from venra import ingestion
+    monkeypatch.setattr(ingestion.settings, "PARSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(ingestion.settings, "PARSE_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(ingestion, "_PARSE_CACHE", {})
+    original, renamed = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    original.write_bytes(b"%PDF-1.7 same filing")
+    renamed.write_bytes(b"%PDF-1.7 same filing")
+
+    mock_doc = MagicMock()
+    mock_doc.text = "# Item 7\nRevenue grew.\n| A | B |\n|---|---|\n| 1 | 2 |"
+    parser = StructuralParser(api_key="fake_key")
+
+    with patch("venra.ingestion.LlamaParse.aload_data", return_value=[mock_doc]) as mock_load:
+        first = await parser.parse_pdf(str(original))
+        second = await parser.parse_pdf(str(renamed))
+        ingestion._PARSE_CACHE.clear()
+        from_disk = await parser.parse_pdf(str(original))
+
+    assert mock_load.call_count == 1
+    assert second == first and from_disk == first
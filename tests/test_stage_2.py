@@ -1,6 +1,8 @@
 import pytest
+import os
+import json
 import pandas as pd
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from venra.models import DocBlock, BlockType, EntityMetadata, TableBlock, UFLRow, TextBlock, FactExtractionResponse, ScrapedFact
 from venra.synthesis import EntityResolver, TableMelter, TextSynthesizer, ContextIndexer
 
@@ -34,6 +36,7 @@ async def test_entity_resolution_flow(mock_cover_blocks):
     # We mock the `create` method of the instructor client
     with patch("venra.synthesis.instructor.from_openai") as mock_instructor_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_instructor_init.return_value = mock_client
         
         # When client.chat.completions.create is called, return our mock object
@@ -55,6 +58,33 @@ async def test_entity_resolution_flow(mock_cover_blocks):
         user_content = messages[1]['content']
         assert "TransDigm Group Incorporated" in user_content
 
+@pytest.mark.asyncio
+async def test_entity_resolution_known_registry(mock_cover_blocks, tmp_path, monkeypatch):
+    """
+    Test that a registrant resolved once is served from the registry on the next filing.
+    """
+    from venra.config import settings
+    monkeypatch.setattr(settings, "KNOWN_ENTITIES_ENABLED", True)
+    monkeypatch.setattr(settings, "KNOWN_ENTITIES_PATH", str(tmp_path / "known_entities.json"))
+    mock_metadata = EntityMetadata(canonical_id="ID_TDG", official_name="TransDigm Group Incorporated", cik="0001260221")
+
+    with patch("venra.synthesis.instructor.from_openai") as mock_instructor_init:
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_metadata)
+        mock_instructor_init.return_value = mock_client
+
+        first = await EntityResolver(api_key="fake_key").resolve_entity(mock_cover_blocks)
+        # A fresh resolver (new process) reads the registry from disk
+        by_name = await EntityResolver(api_key="fake_key").resolve_entity(mock_cover_blocks)
+        by_cik = await EntityResolver(api_key="fake_key").resolve_entity(
+            [DocBlock(block_type=BlockType.TEXT, content="Central Index Key: 0001260221", section_path=[])]
+        )
+
+    assert mock_client.chat.completions.create.call_count == 1
+    assert by_name == first and by_cik == first
+    # Swapped in atomically: no temp files are left beside the registry
+    assert os.listdir(tmp_path) == ["known_entities.json"]
+
 # ==========================================
 # Feature: Table Melting & Extraction
 # ==========================================
@@ -132,6 +162,25 @@ def test_table_melter_no_scaling():
     assert rows[0].value == 1200.0
     assert rows[0].scale_factor == 1.0
 
+def test_table_melter_blank_label_header():
+    """
+    Test that a blank first header cell (common in 10-K tables) still yields the row labels.
+    """
+    markdown = """
+|  | 2023 | 2023 |
+|---|---|---|
+| Net Sales | 100 | 95 |
+"""
+    block = TableBlock(content=markdown, section_path=["General Info"])
+
+    melter = TableMelter(entity_id="ID_TEST")
+    rows = melter.melt(block)
+
+    assert [(r.metric_name, r.period, r.value) for r in rows] == [
+        ("Net Sales", "2023", 100.0),
+        ("Net Sales", "2023.1", 95.0)
+    ]
+
 def test_melter_placeholder_rows():
     """
     Test that 'I Don't Know' scenarios create placeholder rows instead of skipping.
@@ -208,6 +257,7 @@ async def test_text_synthesizer_numerical():
     
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         mock_client.chat.completions.create.return_value = mock_resp
         
@@ -244,6 +294,7 @@ async def test_text_synthesizer_qualitative():
     
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         mock_client.chat.completions.create.return_value = mock_resp
         
@@ -275,6 +326,7 @@ async def test_text_synthesizer_implicit_period():
     
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         mock_client.chat.completions.create.return_value = mock_resp
         
@@ -308,6 +360,7 @@ async def test_text_synthesizer_string_id_handling():
     
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         mock_client.chat.completions.create.return_value = mock_resp
         
@@ -362,6 +415,7 @@ async def test_text_synthesizer_multiple_facts_single_block():
 
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         mock_client.chat.completions.create.return_value = mock_resp
 
@@ -387,13 +441,256 @@ async def test_text_synthesizer_multiple_facts_single_block():
             assert row.source_chunk_id == block.id
             assert row.entity_id == "ID_TEST"
 
+
+@pytest.mark.asyncio
+async def test_text_synthesizer_batch_api():
+    """
+    Test that blocks are submitted as one Batch API job and results are mapped back by custom_id.
+    """
+    import json
+    block = TextBlock(content="Net sales were $6,585 million in fiscal 2023.", section_path=["MD&A"])
+    block.id = "block_1"
+    fact = {"metric_name": "Net Sales", "value": 6585.0, "unit": "USD", "period": "2023", "confidence": 0.9}
+
+    synthesizer = TextSynthesizer(entity_id="ID_TEST", api_key="fake")
+    request = synthesizer.prepare_batch_request(block)
+    assert request["custom_id"] == "block_1"
+    assert request["body"]["response_format"] == {"type": "json_object"}
+    assert "Return JSON matching this schema" in request["body"]["messages"][0]["content"]
+
+    output_line = json.dumps({
+        "custom_id": "block_1",
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": json.dumps({"facts": [fact]})}}]}}
+    })
+    mock_openai = MagicMock()
+    mock_openai.files.create = AsyncMock()
+    mock_openai.batches.create = AsyncMock(return_value=MagicMock(id="batch_1", status="completed", output_file_id="out_1"))
+    mock_openai.files.content = AsyncMock(return_value=MagicMock(text=output_line))
+    synthesizer.openai_client = mock_openai
+
+    results = await synthesizer.extract_facts_batch([block], poll_interval=0)
+
+    assert mock_openai.files.create.call_args[1]["purpose"] == "batch"
+    assert json.loads(mock_openai.files.create.call_args[1]["file"][1]) == request
+    assert [r.metric_name for r in results["block_1"]] == ["Net Sales"]
+    assert results["block_1"][0].source_chunk_id == "block_1"
+
+
+@pytest.mark.asyncio
+async def test_text_synthesizer_batch_api_unique_custom_ids():
+    """
+    Test that identical blocks (same id) are submitted once, since the Batch API rejects duplicate custom_ids.
+    """
+    import json
+    blocks = [TextBlock(id="dup", content="(1) Includes amounts from discontinued operations.", section_path=["Notes"]) for _ in range(2)]
+
+    mock_openai = MagicMock()
+    mock_openai.files.create = AsyncMock()
+    mock_openai.batches.create = AsyncMock(return_value=MagicMock(id="batch_1", status="completed", output_file_id="out_1"))
+    mock_openai.files.content = AsyncMock(return_value=MagicMock(text=""))
+    synthesizer = TextSynthesizer(entity_id="ID_TEST", api_key="fake")
+    synthesizer.openai_client = mock_openai
+
+    results = await synthesizer.extract_facts_batch(blocks, poll_interval=0)
+
+    lines = mock_openai.files.create.call_args[1]["file"][1].splitlines()
+    assert [json.loads(l)["custom_id"] for l in lines] == ["dup"]
+    assert results == {"dup": []}
+
+
+@pytest.mark.asyncio
+async def test_text_synthesizer_extract_facts_many():
+    """
+    Test that fan-out extraction keeps block order and isolates a failing block.
+    """
+    blocks = [
+        TextBlock(id=f"b{i}", content=f"Segment {i} revenue was ${i} million.", section_path=["MD&A"])
+        for i in range(3)
+    ]
+
+    def fake_create(**kwargs):
+        content = kwargs["messages"][-1]["content"]
+        if "Segment 1" in content:
+            raise RuntimeError("rate limited")
+        i = int(content.split("Segment ")[1][0])
+        return FactExtractionResponse(facts=[ScrapedFact(metric_name=f"Revenue {i}", value=float(i), period="2023", confidence=0.9)])
+
+    with patch("venra.synthesis.instructor.from_openai") as mock_init:
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
+        mock_init.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = fake_create
+
+        synthesizer = TextSynthesizer(entity_id="ID_TEST", api_key="fake")
+        results = await synthesizer.extract_facts_many(blocks, concurrency=2)
+
+    assert [[r.metric_name for r in rows] for rows in results] == [["Revenue 0"], [], ["Revenue 2"]]
+    assert results[2][0].source_chunk_id == "b2"
+
+@pytest.mark.asyncio
+async def test_groq_rate_limit_is_shared_across_calls():
+    """
+    Test that extraction calls and header normalization all draw from one process-wide Groq limiter.
+    """
+    from venra.http import get_groq_limiter
+    limiter = get_groq_limiter()
+    assert get_groq_limiter() is limiter
+
+    acquired = []
+    original = type(limiter).acquire
+    async def counting_acquire(self, amount=1):
+        acquired.append(self)
+        return await original(self, amount)
+
+    blocks = [TextBlock(id=f"b{i}", content=f"Revenue was ${i} million.", section_path=["MD&A"]) for i in range(2)]
+    with patch("venra.synthesis.instructor.from_openai") as mock_init, \
+         patch.object(type(limiter), "acquire", counting_acquire):
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=FactExtractionResponse(facts=[]))
+        mock_init.return_value = mock_client
+
+        synthesizer = TextSynthesizer(entity_id="ID_TEST", api_key="fake")
+        await synthesizer.extract_facts_many(blocks)
+        await synthesizer.extract_facts_many(blocks[:1])
+        mock_client.chat.completions.create = AsyncMock(return_value=MagicMock(mapping={"Fiscal 2023": "2023"}))
+        await TableMelter(entity_id="ID_TEST").normalize_headers_batch({"t1": ["Fiscal 2023"]})
+
+    assert len(acquired) == 4 and all(l is limiter for l in acquired)
+
+def test_text_synthesizer_static_system_prefix():
+    """
+    Test that the system message is identical across blocks and the block text lives in the user turn.
+    """
+    synthesizer = TextSynthesizer(entity_id="ID_TEST", api_key="fake")
+    first = synthesizer._build_messages(TextBlock(content="Revenue was $5 million.", section_path=["MD&A"]), "FY 2023")
+    second = synthesizer._build_messages(TextBlock(content="Debt was $7 million.", section_path=["Notes"]), "FY 2023")
+
+    assert first[0] == second[0]
+    assert "Revenue was $5 million." not in first[0]["content"]
+    assert "Revenue was $5 million." in first[1]["content"] and "MD&A" in first[1]["content"]
+
+@pytest.mark.asyncio
+async def test_text_synthesizer_packs_blocks_per_call():
+    """
+    Test that packed extraction makes one call per group and routes facts back by block index.
+    """
+    from venra.models import IndexedScrapedFact, MultiBlockFactExtractionResponse
+    blocks = [
+        TextBlock(id=f"b{i}", content=f"Segment {i} revenue was ${i} million.", section_path=["MD&A"])
+        for i in range(5)
+    ]
+
+    def fake_create(**kwargs):
+        content = kwargs["messages"][-1]["content"]
+        first = int(content.split("Segment ")[1][0])
+        count = content.count("[BLOCK ")
+        if kwargs["response_model"] is FactExtractionResponse:
+            # A group left with a single block goes through the plain single-block call
+            return FactExtractionResponse(facts=[ScrapedFact(metric_name=f"Revenue {first}", value=float(first), period="2023", confidence=0.9)])
+        return MultiBlockFactExtractionResponse(facts=[
+            IndexedScrapedFact(metric_name=f"Revenue {first + n}", value=float(first + n), period="2023",
+                               confidence=0.9, source_block_index=n)
+            for n in range(count)
+        ])
+
+    with patch("venra.synthesis.instructor.from_openai") as mock_init:
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
+        mock_init.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = fake_create
+
+        synthesizer = TextSynthesizer(entity_id="ID_TEST", api_key="fake")
+        results = await synthesizer.extract_facts_many(blocks, blocks_per_call=2)
+
+    assert mock_client.chat.completions.create.call_count == 3
+    assert [[r.metric_name for r in rows] for rows in results] == [[f"Revenue {i}"] for i in range(5)]
+    assert [rows[0].source_chunk_id for rows in results] == [b.id for b in blocks]
+
+@pytest.mark.asyncio
+async def test_text_synthesizer_llm_cache(tmp_path):
+    """
+    Test that an identical prompt is answered from the LLM cache on the second call.
+    """
+    from venra.config import settings
+    block = TextBlock(content="Revenue was $500 million in 2023.", section_path=["MD&A"])
+    mock_resp = FactExtractionResponse(facts=[ScrapedFact(metric_name="Revenue", value=500.0, period="2023", confidence=0.9)])
+
+    with patch("venra.synthesis.instructor.from_openai") as mock_init, \
+         patch.object(settings, "LLM_CACHE_ENABLED", True), \
+         patch.object(settings, "LLM_CACHE_PATH", str(tmp_path / "llm_cache.db")):
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
+        mock_init.return_value = mock_client
+        mock_client.chat.completions.create.return_value = mock_resp
+
+        synthesizer = TextSynthesizer(entity_id="ID_TEST", api_key="fake")
+        first = await synthesizer.extract_facts(block, context_str="FY2023")
+        second = await synthesizer.extract_facts(block, context_str="FY2023")
+        await synthesizer.extract_facts(block, context_str="FY2024")
+
+    assert mock_client.chat.completions.create.call_count == 2
+    assert first == second
+
+@pytest.mark.asyncio
+async def test_text_synthesizer_cache_reuses_repeated_text(tmp_path):
+    """
+    Test that the same text under another section is served from the cache with its own section and chunk.
+    """
+    from venra.config import settings
+    original = TextBlock(id="b1", content="Revenue was $500 million in 2023.", section_path=["MD&A"])
+    repeated = TextBlock(id="b2", content="Revenue was $500 million in 2023.", section_path=["Exhibit 13"])
+    mock_resp = FactExtractionResponse(facts=[ScrapedFact(metric_name="Revenue", value=500.0, period="2023", confidence=0.9)])
+
+    with patch("venra.synthesis.instructor.from_openai") as mock_init, \
+         patch.object(settings, "LLM_CACHE_ENABLED", True), \
+         patch.object(settings, "LLM_CACHE_PATH", str(tmp_path / "llm_cache.db")):
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_resp)
+        mock_init.return_value = mock_client
+
+        synthesizer = TextSynthesizer(entity_id="ID_TEST", api_key="fake")
+        await synthesizer.extract_facts(original, context_str="FY2023")
+        rows = await synthesizer.extract_facts(repeated, context_str="FY2023")
+
+    assert mock_client.chat.completions.create.call_count == 1
+    assert rows[0].doc_section == "Exhibit 13" and rows[0].source_chunk_id == "b2"
+
+def test_text_synthesizer_looks_factual():
+    """
+    Test the local prefilter that decides whether a text block is worth an LLM call.
+    """
+    assert TextSynthesizer._looks_factual("Net sales were $ 1.2 billion.")
+    assert TextSynthesizer._looks_factual("Margin improved 150 bps year over year.")
+    assert TextSynthesizer._looks_factual("Backlog decreased by approximately 12 units.")
+    assert TextSynthesizer._looks_factual("We employed 16,300 people.")
+    assert not TextSynthesizer._looks_factual("See Item 7 on page 45 of the 2023 Form 10-K.")
+
+def test_text_synthesizer_prefilter_keeps_baseline_fact_sentences():
+    """
+    Test that fact sentences the baseline money/digit gate sent to extraction still pass the prefilter.
+    """
+    from venra.pipeline import _looks_financial
+    sentences = [
+        "Net income was 412 in fiscal 2024.",
+        "Diluted EPS was 3.45 compared to 2.10.",
+        "The Company repurchased 800 shares at 15.20 per share.",
+        "Revenue of 1200 was recognized in 2023.",
+        "Operating margin was 12.5 in 2024 versus 11.0 in 2023.",
+        "Net sales were $6,585 million in fiscal 2023.",
+        "Cash and equivalents totaled 845 at year end 2023.",
+    ]
+    for text in sentences:
+        assert _looks_financial(text), text
+        assert TextSynthesizer._looks_factual(text), text
+
+
 # ==========================================
 # Feature: Context Indexing (ChromaDB)
 # ==========================================
 
 @pytest.fixture
 def mock_chroma():
-    with patch("venra.synthesis.chromadb.PersistentClient") as mock_client:
+    with patch("venra.vector_store.chromadb.PersistentClient") as mock_client:
         yield mock_client
 
 def test_context_indexer_blocks(mock_chroma):
@@ -423,6 +720,21 @@ def test_context_indexer_blocks(mock_chroma):
     assert call_args['ids'] == [block.id]
     assert call_args['metadatas'][0]['page_num'] == 10
 
+@pytest.mark.asyncio
+async def test_context_indexer_batches_blocks(mock_chroma):
+    """
+    Test that blocks are upserted in CHROMA_ADD_BATCH-sized batches off the event loop.
+    """
+    mock_collection = MagicMock()
+    mock_chroma.return_value.get_or_create_collection.return_value = mock_collection
+    indexer = ContextIndexer()
+
+    blocks = [TextBlock(content=f"Block {i}", section_path=["S"]) for i in range(5)]
+    await indexer.aindex_blocks(blocks, batch_size=2)
+
+    batches = [c[1]["documents"] for c in mock_collection.upsert.call_args_list]
+    assert batches == [["Block 0", "Block 1"], ["Block 2", "Block 3"], ["Block 4"]]
+
 def test_context_indexer_ufl_schema(mock_chroma):
     """
     Test that UFLRow metric names are indexed for semantic schema mapping.
@@ -447,13 +759,140 @@ def test_context_indexer_ufl_schema(mock_chroma):
     indexer.index_ufl_schema([row])
     
     # Verify add was called for the metric
-    mock_collection.add.assert_called()
-    kwargs = mock_collection.add.call_args[1]
+    mock_collection.upsert.assert_called()
+    kwargs = mock_collection.upsert.call_args[1]
     
     assert kwargs['documents'] == ["Senior Notes Payable"]
     assert kwargs['metadatas'][0]['metric_name'] == "Senior Notes Payable"
     assert kwargs['metadatas'][0]['entity_id'] == "ID_AAPL"
 
+def test_context_indexer_ufl_schema_merges_spelling_variants(mock_chroma):
+    """
+    Test that metric names differing only in case/punctuation are embedded once, with variants kept.
+    """
+    mock_collection = MagicMock()
+    mock_chroma.return_value.get_or_create_collection.return_value = mock_collection
+    indexer = ContextIndexer()
+
+    def row(metric, period, entity="ID_AAPL"):
+        return UFLRow(row_id=f"{entity}{metric}{period}", entity_id=entity, entity_name_raw="Apple Inc.", metric_name=metric,
+                      value=1.0, period=period, doc_section="Note 5", source_chunk_id="c1", confidence=0.9)
+
+    indexer.index_ufl_schema([
+        row("Senior Notes Payable", "2023"), row("Senior notes, payable", "2022"),
+        row("Senior Notes Payable", "2022"), row("Senior Notes Payable", "2023", entity="ID_MSFT"),
+    ])
+
+    kwargs = mock_collection.upsert.call_args[1]
+    assert kwargs['documents'] == ["Senior Notes Payable", "Senior Notes Payable"]
+    assert json.loads(kwargs['metadatas'][0]['variants']) == ["Senior notes, payable"]
+    assert "variants" not in kwargs['metadatas'][1]
+
+def test_context_indexer_ufl_schema_rerun_merges_stored_variants(mock_chroma):
+    """
+    Test that a rerun seeing another spelling first updates the same entry and keeps the stored variants.
+    """
+    mock_collection = MagicMock()
+    mock_chroma.return_value.get_or_create_collection.return_value = mock_collection
+    indexer = ContextIndexer()
+
+    def row(metric):
+        return UFLRow(row_id=metric, entity_id="ID_AAPL", entity_name_raw="Apple Inc.", metric_name=metric,
+                      value=1.0, period="2023", doc_section="Note 5", source_chunk_id="c1", confidence=0.9)
+
+    indexer.index_ufl_schema([row("Senior Notes Payable"), row("Senior notes, payable")])
+    first = mock_collection.upsert.call_args[1]
+    mock_collection.get.return_value = {"ids": first['ids'], "metadatas": first['metadatas']}
+
+    indexer.index_ufl_schema([row("SENIOR NOTES PAYABLE")])
+
+    kwargs = mock_collection.upsert.call_args[1]
+    assert kwargs['ids'] == first['ids']
+    assert kwargs['documents'] == ["Senior Notes Payable"]
+    assert json.loads(kwargs['metadatas'][0]['variants']) == ["Senior notes, payable", "SENIOR NOTES PAYABLE"]
+
+def test_context_indexer_ufl_schema_migrates_legacy_ids(mock_chroma):
+    """
+    Test that a schema entry stored under the old per-spelling id is merged into the normalized entry and deleted.
+    """
+    from venra.hashing import content_id
+    mock_collection = MagicMock()
+    mock_chroma.return_value.get_or_create_collection.return_value = mock_collection
+    indexer = ContextIndexer()
+    legacy_id = content_id("ID_AAPL_Senior notes, payable")
+    mock_collection.get.return_value = {
+        "ids": [legacy_id], "metadatas": [{"entity_id": "ID_AAPL", "metric_name": "Senior notes, payable"}]
+    }
+
+    indexer.index_ufl_schema([UFLRow(row_id="r1", entity_id="ID_AAPL", entity_name_raw="Apple Inc.",
+                                     metric_name="Senior notes, payable", value=1.0, period="2023",
+                                     doc_section="Note 5", source_chunk_id="c1", confidence=0.9),
+                              UFLRow(row_id="r2", entity_id="ID_AAPL", entity_name_raw="Apple Inc.",
+                                     metric_name="Senior Notes Payable", value=1.0, period="2023",
+                                     doc_section="Note 5", source_chunk_id="c1", confidence=0.9)])
+
+    assert legacy_id in mock_collection.get.call_args[1]["ids"]
+    kwargs = mock_collection.upsert.call_args[1]
+    assert kwargs['ids'] != [legacy_id]
+    assert kwargs['documents'] == ["Senior notes, payable"]
+    assert json.loads(kwargs['metadatas'][0]['variants']) == ["Senior Notes Payable"]
+    mock_collection.delete.assert_called_once_with(ids=[legacy_id])
+
+def test_context_indexer_embeds_repeated_inputs_once(mock_chroma):
+    """
+    Test that a metric name shared across entities and duplicate blocks are embedded once.
+    """
+    mock_collection = MagicMock()
+    mock_chroma.return_value.get_or_create_collection.return_value = mock_collection
+    calls = []
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+    indexer = ContextIndexer(embedding_fn=embed)
+
+    def row(metric, entity):
+        return UFLRow(row_id=f"{entity}{metric}", entity_id=entity, entity_name_raw="X", metric_name=metric,
+                      value=1.0, period="2023", doc_section="Note 5", source_chunk_id="c1", confidence=0.9)
+
+    indexer.index_ufl_schema([row("Revenue", "ID_AAPL"), row("Revenue", "ID_MSFT"), row("Net Income", "ID_MSFT")])
+
+    assert calls == [["Revenue", "Net Income"]]
+    kwargs = mock_collection.upsert.call_args[1]
+    assert kwargs['embeddings'] == [[7.0], [7.0], [10.0]]
+
+    indexer._text_embedding_fn = embed
+    block = TextBlock(id="b1", content="Revenue was $100M.", section_path=["MD&A"])
+    repeat = TextBlock(id="b2", content="Revenue was $100M.", section_path=["Exhibit 13"])
+    indexer.index_blocks([block, block, repeat])
+
+    assert calls[-1] == ["Revenue was $100M."]
+    assert mock_collection.upsert.call_args[1]['ids'] == [block.id, repeat.id]
+
+def test_context_indexer_shares_chroma_client(mock_chroma, tmp_path):
+    """
+    Test that indexers on the same store path reuse one PersistentClient.
+    """
+    first = ContextIndexer(db_path=str(tmp_path / "db"))
+    second = ContextIndexer(db_path=str(tmp_path / "db"))
+    ContextIndexer(db_path=str(tmp_path / "other"))
+
+    assert first.client is second.client
+    assert mock_chroma.call_count == 2
+
+def test_context_indexer_uses_configured_embedder(mock_chroma, monkeypatch):
+    """
+    Test that EMBEDDING_MODEL gives both collections the shared embedding function.
+    """
+    from venra import vector_store
+    embedder = MagicMock()
+    monkeypatch.setattr(vector_store.settings, "EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    monkeypatch.setattr(vector_store, "_sentence_transformer_fn", lambda model, device, fp16: embedder)
+
+    ContextIndexer()
+
+    calls = mock_chroma.return_value.get_or_create_collection.call_args_list
+    assert [c.kwargs["embedding_function"] for c in calls] == [embedder, embedder]
+
 def test_indexer_back_population(mock_chroma):
     """
     Test that we can update chunk metadata with extracted row IDs.
@@ -474,4 +913,33 @@ def test_indexer_back_population(mock_chroma):
     
     assert kwargs['ids'] == [chunk_id]
     assert "contains_rows" in kwargs['metadatas'][0]
-    assert "row_a" in kwargs['metadatas'][0]["contains_rows"]
\ No newline at end of file
+    assert "row_a" in kwargs['metadatas'][0]["contains_rows"]
+
+def test_indexer_back_population_batched(mock_chroma):
+    """
+    Test that a document's chunk linkages go out as batched updates, skipping empty ones.
+    """
+    mock_collection = MagicMock()
+    mock_chroma.return_value.get_or_create_collection.return_value = mock_collection
+
+    indexer = ContextIndexer()
+    indexer.update_chunk_linkages({"c1": ["r1"], "c2": [], "c3": ["r2", "r3"], "c4": ["r4"]}, batch_size=2)
+
+    calls = [c[1] for c in mock_collection.update.call_args_list]
+    assert [c["ids"] for c in calls] == [["c1", "c3"], ["c4"]]
+    assert json.loads(calls[0]["metadatas"][1]["contains_rows"]) == ["r2", "r3"]
+
+def test_row_id_hash_setting():
+    """
+    Test that row ids default to md5 and switch to BLAKE2b-128 via settings.ROW_ID_HASH.
+    """
+    import hashlib
+    from venra.config import settings
+
+    block = TableBlock(content="| Item | 2023 |\n|---|---|\n| Cash | 5 |", section_path=["General Info"])
+    melter = TableMelter(entity_id="ID_TEST")
+    seed = f"ID_TEST_Cash_2023_{block.id}_5.0"
+
+    assert melter.melt(block)[0].row_id == hashlib.md5(seed.encode()).hexdigest()
+    with patch.object(settings, "ROW_ID_HASH", "blake2b"):
+        assert melter.melt(block)[0].row_id == hashlib.blake2b(seed.encode(), digest_size=16).hexdigest()
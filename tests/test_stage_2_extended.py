@@ -1,7 +1,7 @@
 import pytest
 import pandas as pd
 from typing import Any
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from venra.models import DocBlock, BlockType, EntityMetadata, TableBlock, UFLRow, TextBlock, FactExtractionResponse, ScrapedFact
 from venra.synthesis import EntityResolver, TableMelter, TextSynthesizer, ContextIndexer
 
@@ -35,6 +35,7 @@ async def test_entity_resolution_flow(mock_cover_blocks):
     # We mock the `create` method of the instructor client
     with patch("venra.synthesis.instructor.from_openai") as mock_instructor_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_instructor_init.return_value = mock_client
         
         # When client.chat.completions.create is called, return our mock object
@@ -144,6 +145,7 @@ async def test_header_date_normalization():
     
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         
         # Setup the mock to return the object
@@ -160,6 +162,70 @@ async def test_header_date_normalization():
         call_args = mock_client.chat.completions.create.call_args
         assert "ISO 8601" in str(call_args) # We must instruct SLM to use ISO format
 
+@pytest.mark.asyncio
+async def test_header_batch_normalization():
+    """
+    Test that headers shared across tables are normalized once, in capped batches.
+    """
+    def fake_create(**kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        return MagicMock(mapping={h: f"iso:{h}" for h in headers if repr(h) in prompt})
+
+    headers = [f"FY {2000 + i}" for i in range(60)]
+    with patch("venra.synthesis.instructor.from_openai") as mock_init:
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
+        mock_init.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = fake_create
+
+        melter = TableMelter(entity_id="ID_TEST")
+        result = await melter.normalize_headers_batch({"t1": headers[:40], "t2": headers[20:], "t3": []})
+
+    # 60 unique headers -> two calls at the 50-header cap
+    assert mock_client.chat.completions.create.call_count == 2
+    assert result["t1"]["FY 2000"] == "iso:FY 2000"
+    assert list(result["t2"]) == headers[20:]
+    assert result["t3"] == {}
+
+@pytest.mark.asyncio
+async def test_header_batch_resolves_simple_headers_locally():
+    """
+    Test that bare years and plain dates never reach the SLM.
+    """
+    with patch("venra.synthesis.instructor.from_openai") as mock_init:
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=MagicMock(mapping={"Fiscal 2023": "2023"}))
+        mock_init.return_value = mock_client
+
+        melter = TableMelter(entity_id="ID_TEST")
+        result = await melter.normalize_headers_batch({"t1": ["2024", "December 31, 2023", "Fiscal 2023"]})
+
+    assert result["t1"] == {"2024": "2024", "December 31, 2023": "2023-12-31", "Fiscal 2023": "2023"}
+    prompt = mock_client.chat.completions.create.call_args[1]["messages"][0]["content"]
+    assert "Fiscal 2023" in prompt and "December" not in prompt
+
+@pytest.mark.asyncio
+async def test_header_batch_keeps_qualified_and_colliding_headers_raw():
+    """
+    Test that Restated/quarter qualifiers are never normalized and that two headers mapping to one period stay raw.
+    """
+    with patch("venra.synthesis.instructor.from_openai") as mock_init:
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=MagicMock(mapping={"FY 2024": "2024", "Fiscal 2023": "2023"}))
+        mock_init.return_value = mock_client
+
+        melter = TableMelter(entity_id="ID_TEST")
+        result = await melter.normalize_headers_batch({
+            "t1": ["2024 (Restated)", "Three Months Ended March 31, 2024", "Fiscal 2023"],
+            "t2": ["2024", "FY 2024", "Fiscal 2023"],
+        })
+
+    prompt = mock_client.chat.completions.create.call_args[1]["messages"][0]["content"]
+    assert "Restated" not in prompt and "Three Months" not in prompt
+    assert result["t1"] == {"Fiscal 2023": "2023"}
+    # "2024" and "FY 2024" would both become "2024": neither is rewritten
+    assert result["t2"] == {"Fiscal 2023": "2023"}
+
 # ==========================================
 # Feature: The "Restated" Logic (Data Collision)
 # ==========================================
@@ -201,14 +267,14 @@ class MockEmbeddingFunction:
     def name(self) -> str:
         return "mock"
 
-def test_semantic_schema_embedding_call():
+def test_semantic_schema_embedding_call(tmp_path):
     """
     Test that we actually generate embeddings for the metrics.
     If this isn't mocked, the test suite might try to call OpenAI/HuggingFace API.
     """
     mock_embedding_fn = MockEmbeddingFunction()
     
-    indexer = ContextIndexer(embedding_fn=mock_embedding_fn)
+    indexer = ContextIndexer(db_path=str(tmp_path / "chroma_db"), embedding_fn=mock_embedding_fn)
     
     row = UFLRow(
         row_id="1", entity_id="A", entity_name_raw="Alpha Corp", metric_name="Revenue", 
@@ -246,6 +312,7 @@ async def test_text_synthesizer_relationships():
     
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         mock_client.chat.completions.create.return_value = mock_resp
         
@@ -324,6 +391,7 @@ async def test_text_synthesizer_inequalities():
     
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         mock_client.chat.completions.create.return_value = mock_resp
         
@@ -358,6 +426,7 @@ async def test_text_synthesizer_basis_points():
     
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         mock_client.chat.completions.create.return_value = mock_resp
         
@@ -401,6 +470,7 @@ async def test_graph_relationship_extraction():
     
     with patch("venra.synthesis.instructor.from_openai") as mock_init:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_init.return_value = mock_client
         mock_client.chat.completions.create.return_value = mock_resp
         